@@ -1,37 +1,75 @@
-import itertools
+from importlib.util import find_spec
 from pathlib import Path
-import pandas as pd
+import numpy as np
+import route_gen
+import duration_engine
+import duration_matrix
+import instrumentation
 
 # Line up depot name with the matrix
-NAME_MAP = {"Centre Port": "CentrePort Wellington"}
+NAME_MAP = duration_matrix.ALIASES
 
 
 def norm(name: str) -> str:
-    return NAME_MAP.get(name.strip(), name.strip())
+    return duration_matrix.normalize_name(name, NAME_MAP)
 
 
 def build_lookup(matrix_csv: Path):
-    df = pd.read_csv(matrix_csv)
-    df = df.rename(columns={df.columns[0]: "origin"})
-    dests = [c for c in df.columns if c != "origin"]
-    lookup = {}
-    for _, row in df.iterrows():
-        o = str(row["origin"]).strip()
-        for d in dests:
-            val = row[d]
-            if pd.notnull(val):
-                lookup[(o, d)] = float(val)  # seconds from matrix
-    return lookup
-
-
-def generate_tours(nodes, demand, start, max_demand, max_intermediate=4):
-    others = list(nodes - {start})
-    tours = []
-    for r in range(1, max_intermediate + 1):
-        for perm in itertools.permutations(others, r):
-            path = [start] + list(perm) + [start]
-            if sum(demand[s] for s in path) <= max_demand:
-                tours.append(path)
+    # Parsed once, then memory-mapped from the binary cache next to the CSV
+    with instrumentation.stage("load_matrix"):
+        return duration_matrix.DurationMatrix.from_csv(matrix_csv).lookup()
+
+
+def generate_tours(
+    nodes,
+    demand,
+    start,
+    max_demand,
+    max_intermediate=4,
+    lookup=None,
+    best_order=False,
+    neighbors=None,
+    depot_band=None,
+    stats=None,
+):
+    # neighbors: only let each store be followed by its k nearest stores
+    # (depot_band: and by stores about as far from the depot, in seconds)
+    # stats: optional dict that collects route_gen's pruning counts
+    candidates = None
+    if neighbors is not None:
+        if lookup is None:
+            raise ValueError("neighbors needs the duration lookup.")
+        candidates = route_gen.nearest_candidates(
+            nodes,
+            start,
+            lambda a, b: lookup.get((norm(a), norm(b))),
+            neighbors,
+            depot_band,
+        )
+
+    # Only the cheapest ordering of each store set, one route per set
+    if best_order:
+        if lookup is None:
+            raise ValueError("best_order needs the duration lookup.")
+        found = route_gen.best_tours(
+            nodes,
+            demand,
+            start,
+            max_demand,
+            lambda a, b: lookup.get((norm(a), norm(b))),
+            max_intermediate,
+            candidates=candidates,
+            stats=stats,
+        )
+    else:
+        # Depth-first, so paths over capacity are dropped before they are extended
+        found = route_gen.enumerate_tours(
+            nodes, demand, start, max_demand, max_intermediate, candidates=candidates, stats=stats
+        )
+
+    with instrumentation.stage("generate_tours") as stage:
+        tours = [path for path, _, _ in found]
+        stage.count("tours_kept", len(tours))
     return tours
 
 
@@ -45,6 +83,15 @@ def compute_travel_seconds(stops, lookup):
     return total
 
 
+def compute_travel_seconds_batch(tours, lookup):
+    # Vectorized compute_travel_seconds over many tours, NaN where a leg is missing
+    index, matrix = duration_engine.lookup_matrix(lookup)
+    stops, lengths = duration_engine.encode_tours(
+        [[norm(stop) for stop in path] for path in tours], index
+    )
+    return duration_engine.travel_seconds(matrix, stops, lengths)
+
+
 def compute_unloading_seconds(
     stops, demand, depot_name="Centre Port", unload_minutes_per_box=15
 ):
@@ -65,59 +112,139 @@ BASE_RATE_PER_MIN = BASE_RATE_PER_HR / 60.0
 OT_RATE_PER_MIN = OT_RATE_PER_HR / 60.0
 
 
-def compute_costs(total_seconds):
+def compute_costs(
+    total_seconds,
+    shift_minutes=SHIFT_MINUTES,
+    base_rate_per_hr=BASE_RATE_PER_HR,
+    ot_rate_per_hr=OT_RATE_PER_HR,
+):
+    # Works on one route's seconds or on an array of them
     total_minutes = total_seconds / 60.0
-    base_minutes = min(total_minutes, SHIFT_MINUTES)
-    overtime_minutes = max(total_minutes - SHIFT_MINUTES, 0.0)
-    base_cost = base_minutes * BASE_RATE_PER_MIN
-    overtime_cost = overtime_minutes * OT_RATE_PER_MIN
+    base_minutes = np.minimum(total_minutes, shift_minutes)
+    overtime_minutes = np.maximum(total_minutes - shift_minutes, 0.0)
+    base_cost = base_minutes * base_rate_per_hr / 60.0
+    overtime_cost = overtime_minutes * ot_rate_per_hr / 60.0
     total_cost = base_cost + overtime_cost
     return base_minutes, overtime_minutes, base_cost, overtime_cost, total_cost
 
 
-def save_csvs_with_costs(
-    tours, lookup, demand, full_out_csv, slim_out_csv, unload_minutes_per_box=15
+def cost_columns(
+    tours,
+    lookup,
+    demand,
+    unload_minutes_per_box=15,
+    shift_minutes=SHIFT_MINUTES,
+    base_rate_per_hr=BASE_RATE_PER_HR,
+    ot_rate_per_hr=OT_RATE_PER_HR,
+    tensor=None,
+    departure_minutes=0.0,
 ):
-    rows = []
-    slim_rows = []
-    for path in tours:
-        travel_sec = compute_travel_seconds(path, lookup)
-        if travel_sec is None:
-            continue
-
-        unloading_sec = compute_unloading_seconds(
-            path,
-            demand,
-            depot_name="Centre Port",
-            unload_minutes_per_box=unload_minutes_per_box,
+    # Every column of the detailed output as arrays over all tours at once;
+    # tours with a leg missing from the lookup are dropped.
+    # With a DurationTensor the legs are read from the time slice each one
+    # starts in, every route leaving the depot at departure_minutes.
+    with instrumentation.stage("cost_routes", tours=len(tours)) as stage:
+        if tensor is None:
+            index, matrix = duration_engine.lookup_matrix(lookup)
+        else:
+            index = tensor.index
+        stops, lengths = duration_engine.encode_tours(
+            [[norm(stop) for stop in path] for path in tours], index
         )
-        total_sec = travel_sec + unloading_sec
-        base_min, ot_min, base_cost, ot_cost, total_cost = compute_costs(total_sec)
-
-        rows.append(
-            {
-                "route": "->".join(path),
-                "travel_seconds": travel_sec,
-                "unloading_seconds": unloading_sec,
-                "total_time_seconds": total_sec,
-                "total_time_minutes": total_sec / 60.0,
-                "base_minutes_billed": base_min,
-                "overtime_minutes_billed": ot_min,
-                "base_cost": base_cost,
-                "overtime_cost": ot_cost,
-                "total_cost": total_cost,
-            }
+        boxes = np.zeros(len(tensor) if tensor is not None else len(index))
+        for store, count in demand.items():
+            if norm(store) in index:
+                boxes[index[norm(store)]] = count
+        if tensor is None:
+            travel_sec = duration_engine.travel_seconds(matrix, stops, lengths)
+        else:
+            travel_sec = duration_engine.timed_travel_seconds(
+                tensor.array,
+                tensor.slice_seconds,
+                stops,
+                lengths,
+                boxes,
+                unload_minutes_per_box,
+                departure_minutes * 60.0,
+            )
+        unloading_sec = duration_engine.unloading_seconds(
+            boxes, stops, lengths, unload_minutes_per_box
         )
-        slim_rows.append(
-            {
-                "route": "->".join(path),
-                "total_cost": total_cost,
-            }
+
+        keep = ~np.isnan(travel_sec)
+        stage.count("routes_costed", int(keep.sum()))
+        stage.count("routes_dropped", int((~keep).sum()))
+        travel_sec = travel_sec[keep]
+        unloading_sec = unloading_sec[keep]
+        costs = compute_costs(travel_sec + unloading_sec, shift_minutes, base_rate_per_hr, ot_rate_per_hr)
+        return costed_columns(
+            ["->".join(path) for path, kept in zip(tours, keep) if kept], travel_sec, unloading_sec, costs
         )
 
-    # Save both
-    pd.DataFrame(rows).to_csv(full_out_csv, index=False)
-    pd.DataFrame(slim_rows).to_csv(slim_out_csv, index=False)
+
+# Names of compute_costs' results in the detailed output
+COST_COLUMNS = ("base_minutes_billed", "overtime_minutes_billed", "base_cost", "overtime_cost", "total_cost")
+
+
+def costed_columns(routes, travel_sec, unloading_sec, costs):
+    # The detailed output's columns from each route's seconds and compute_costs' results for them;
+    # shared by cost_columns, route_cache and route_stream
+    total_sec = travel_sec + unloading_sec
+    return {
+        "route": routes,
+        "travel_seconds": travel_sec,
+        "unloading_seconds": unloading_sec,
+        "total_time_seconds": total_sec,
+        "total_time_minutes": total_sec / 60.0,
+        **dict(zip(COST_COLUMNS, costs)),
+    }
+
+
+def write_table(df, out_csv, formats=("csv",)):
+    # CSV plus optional typed binary copies next to it (Parquet/Feather need pyarrow)
+    out_csv = Path(out_csv)
+    for fmt in formats:
+        if fmt == "csv":
+            df.to_csv(out_csv, index=False)
+        elif fmt == "parquet":
+            df.to_parquet(out_csv.with_suffix(".parquet"), index=False)
+        elif fmt == "feather":
+            df.to_feather(out_csv.with_suffix(".feather"))
+        else:
+            raise ValueError(f"Unknown output format: {fmt}")
+
+
+def save_csvs_with_costs(
+    tours,
+    lookup,
+    demand,
+    full_out_csv,
+    slim_out_csv,
+    unload_minutes_per_box=15,
+    formats=("csv",),
+    tensor=None,
+    departure_minutes=0.0,
+):
+    # tensor: optional DurationTensor for time-of-day travel times (lookup is then unused)
+    columns = cost_columns(
+        tours,
+        lookup,
+        demand,
+        unload_minutes_per_box,
+        tensor=tensor,
+        departure_minutes=departure_minutes,
+    )
+    write_costed_tables(columns, full_out_csv, slim_out_csv, formats)
+
+
+def write_costed_tables(columns, full_out_csv, slim_out_csv, formats=("csv",)):
+    # Save both, from the same column arrays
+    import pandas as pd
+
+    with instrumentation.stage("write_outputs", rows=len(columns["route"])):
+        full = pd.DataFrame(columns)
+        write_table(full, full_out_csv, formats)
+        write_table(full[["route", "total_cost"]], slim_out_csv, formats)
 
 
 if __name__ == "__main__":
@@ -171,30 +298,77 @@ if __name__ == "__main__":
     max_demand_standard = 9
     max_demand_extra = 4
     max_intermediate = 4
-    lookup = build_lookup(matrix_csv)
+    # One route per store set (its fastest ordering); False keeps every permutation
+    best_order = True
+    # Typed binary copies of the outputs for van_schedule_solver, when pyarrow is there
+    output_formats = ("csv", "parquet") if find_spec("pyarrow") else ("csv",)
+    # Reuse the unchanged layers of the costed pools from .route_cache
+    use_cache = True
+    # Time-of-day travel times, e.g. one CSV per 30-minute slice:
+    # duration_matrix.DurationTensor.from_csvs([...], slice_minutes=30)
+    tensor = None
+    departure_minutes = 0.0
+    outputs = [
+        # CSV for standard
+        (
+            max_demand_standard,
+            "Routes with Duration & per box - Standard.csv",
+            "Route and Total Cost - Standard.csv",
+        ),
+        # CSV for extra
+        (
+            max_demand_extra,
+            "Routes with Duration & per box - Extra.csv",
+            "Route and Total Cost - Extra.csv",
+        ),
+    ]
 
-    # CSV for standard
-    tours_std = generate_tours(
-        nodes, demand_weekdays, start, max_demand_standard, max_intermediate
-    )
-    save_csvs_with_costs(
-        tours_std,
-        lookup,
-        demand_weekdays,
-        "Routes with Duration & per box - Standard.csv",
-        "Route and Total Cost - Standard.csv",
-        unload_minutes_per_box=15,
-    )
+    if use_cache and tensor is None:
+        import sys
 
-    # CSV for extra
-    tours_extra = generate_tours(
-        nodes, demand_weekdays, start, max_demand_extra, max_intermediate
-    )
-    save_csvs_with_costs(
-        tours_extra,
-        lookup,
-        demand_weekdays,
-        "Routes with Duration & per box - Extra.csv",
-        "Route and Total Cost - Extra.csv",
-        unload_minutes_per_box=15,
-    )
+        # route_cache imports this module by name; let it reuse the running script
+        # instead of loading a second copy
+        sys.modules.setdefault("RouteCost&Duration", sys.modules[__name__])
+        import route_cache
+
+        cache = route_cache.RouteCache()
+        with instrumentation.stage("load_matrix"):
+            durations = duration_matrix.DurationMatrix.from_csv(matrix_csv)
+        for max_demand, full_out_csv, slim_out_csv in outputs:
+            with instrumentation.stage("cached_cost_columns"):
+                columns = route_cache.cached_cost_columns(
+                    cache,
+                    durations,
+                    nodes,
+                    demand_weekdays,
+                    start,
+                    max_demand,
+                    max_intermediate,
+                    best_order=best_order,
+                    unload_minutes_per_box=15,
+                )
+            write_costed_tables(columns, full_out_csv, slim_out_csv, output_formats)
+        print("Route cache hits:", cache.hits, "misses:", cache.misses)
+    else:
+        lookup = build_lookup(matrix_csv)
+        for max_demand, full_out_csv, slim_out_csv in outputs:
+            tours = generate_tours(
+                nodes,
+                demand_weekdays,
+                start,
+                max_demand,
+                max_intermediate,
+                lookup=lookup,
+                best_order=best_order,
+            )
+            save_csvs_with_costs(
+                tours,
+                lookup,
+                demand_weekdays,
+                full_out_csv,
+                slim_out_csv,
+                unload_minutes_per_box=15,
+                formats=output_formats,
+                tensor=tensor,
+                departure_minutes=departure_minutes,
+            )
@@ -0,0 +1,219 @@
+"""
+Scaling benchmarks for the planning pipeline on synthetic instances.
+
+For every store count and van capacity this builds a synthetic duration
+matrix (stores scattered around the depot, symmetric or with one-way
+noise) and demand profile, then times each stage:
+
+    generate_tours          capacity-pruned enumeration (RouteCost&Duration.generate_tours)
+    find_duration           duration_calculator.find_duration over route strings
+    compute_travel_seconds  RouteCost&Duration.compute_travel_seconds_batch over stop lists
+    save_csvs_with_costs    costing plus writing both CSVs
+    model_build             van_schedule_solver.SolverSession
+    solve                   CBC
+
+and writes the timings as JSON. Passing --baseline compares against an
+earlier results file and exits with status 1 if any stage got slower than
+--tolerance times its baseline. The baseline has to be a different file
+from --out, which is overwritten.
+
+    python benchmark_scaling.py --sizes 20 50 100 --out benchmark_baseline.json
+    python benchmark_scaling.py --sizes 20 50 100 --baseline benchmark_baseline.json
+"""
+import importlib
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import duration_calculator
+from duration_matrix import DurationMatrix
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+DEPOT = "Centre Port"
+MATRIX_DEPOT = "CentrePort Wellington"
+
+# Stops per route by default, so the pool stays a few tens of thousands of routes
+DEFAULT_MAX_INTERMEDIATE = {20: 4, 50: 3}
+LARGE_MAX_INTERMEDIATE = 2
+
+# Differences smaller than this many seconds never count as a regression
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def synthetic_instance(n_stores, symmetric=True, seed=0, demand_range=(1, 4)):
+    """
+    Random instance: stores uniformly placed within ~25 km of the depot,
+    driving at ~40 km/h, plus up to 10% one-way noise when not symmetric.
+
+    Returns (durations, demand) with demand keyed by the route-file names.
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"Store {i:03d}" for i in range(n_stores)] + [MATRIX_DEPOT]
+    points = np.vstack([rng.uniform(-25.0, 25.0, size=(n_stores, 2)), [[0.0, 0.0]]])
+    km = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    seconds = km / 40.0 * 3600.0 + 120.0
+    if not symmetric:
+        seconds *= rng.uniform(1.0, 1.1, size=seconds.shape)
+    np.fill_diagonal(seconds, 0.0)
+
+    demand = {name: int(rng.integers(demand_range[0], demand_range[1] + 1)) for name in names[:-1]}
+    demand[DEPOT] = 0
+    return DurationMatrix(names, np.ascontiguousarray(seconds)), demand
+
+
+def time_stage(results, record, stage, function):
+    start = time.perf_counter()
+    value = function()
+    results.append({**record, "stage": stage, "seconds": time.perf_counter() - start})
+    return value
+
+
+def run_case(n_stores, capacity, max_intermediate, symmetric, solve, time_limit, seed, neighbors=None):
+    import van_schedule_solver
+
+    durations, demand = synthetic_instance(n_stores, symmetric=symmetric, seed=seed)
+    record = {
+        "stores": n_stores,
+        "capacity": capacity,
+        "max_intermediate": max_intermediate,
+        "symmetric": symmetric,
+        "neighbors": neighbors,
+    }
+    results = []
+    lookup = durations.lookup()
+    pruning = {}
+
+    tours = time_stage(
+        results, record, "generate_tours",
+        lambda: route_cost.generate_tours(
+            set(demand), demand, DEPOT, capacity, max_intermediate,
+            lookup=lookup, neighbors=neighbors, stats=pruning,
+        ),
+    )
+    record["routes"] = len(tours)
+    record["extensions_pruned"] = pruning.get("extensions_pruned", 0)
+    record["candidates_skipped"] = pruning.get("candidates_skipped", 0)
+    for row in results:
+        row.update(record)
+
+    route_strings = ["->".join(path) for path in tours]
+    demand_total = [sum(demand[stop] for stop in path) for path in tours]
+    time_stage(
+        results, record, "find_duration",
+        lambda: duration_calculator.find_duration(
+            route_strings, durations.array, durations.index, demand_total
+        ),
+    )
+    time_stage(
+        results, record, "compute_travel_seconds",
+        lambda: route_cost.compute_travel_seconds_batch(tours, lookup),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_csv = Path(tmp) / "full.csv"
+        slim_csv = Path(tmp) / "slim.csv"
+        time_stage(
+            results, record, "save_csvs_with_costs",
+            lambda: route_cost.save_csvs_with_costs(tours, lookup, demand, full_csv, slim_csv),
+        )
+        routes_df = pd.read_csv(slim_csv)
+
+    if solve:
+        routes_df["van_type"] = "WW"
+        session = time_stage(
+            results, record, "model_build", lambda: van_schedule_solver.SolverSession(routes_df)
+        )
+        time_stage(results, record, "solve", lambda: session.solve(time_limit=time_limit))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Stages slower than tolerance x their baseline timing (same instance parameters)."""
+    key_fields = ("stores", "capacity", "max_intermediate", "symmetric", "neighbors", "stage")
+    previous = {tuple(row.get(k) for k in key_fields): row["seconds"] for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        before = previous.get(tuple(row.get(k) for k in key_fields))
+        if before is None:
+            continue
+        if row["seconds"] > before * tolerance and row["seconds"] - before > MIN_REGRESSION_SECONDS:
+            regressions.append({**row, "baseline_seconds": before})
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic instances")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200], help="store counts")
+    parser.add_argument("--capacities", type=int, nargs="+", default=[4, 9], help="van capacities in boxes")
+    parser.add_argument(
+        "--max-intermediate", type=int, default=None,
+        help="stops per route (default: 4 for 20 stores, 3 for 50, 2 above)",
+    )
+    parser.add_argument("--asymmetric", action="store_true", help="also run one-way (asymmetric) matrices")
+    parser.add_argument(
+        "--neighbors", type=int, default=None, help="only follow each store by its k nearest stores"
+    )
+    parser.add_argument("--no-solve", action="store_true", help="skip model build and CBC")
+    parser.add_argument("--time-limit", type=float, default=60.0, help="CBC time limit per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor vs the baseline")
+    args = parser.parse_args()
+    if args.baseline and Path(args.out).resolve() == Path(args.baseline).resolve():
+        parser.error("--out would overwrite the --baseline file; write the new timings somewhere else")
+
+    results = []
+    for n_stores in args.sizes:
+        max_intermediate = args.max_intermediate or DEFAULT_MAX_INTERMEDIATE.get(n_stores, LARGE_MAX_INTERMEDIATE)
+        for capacity in args.capacities:
+            for symmetric in [True, False] if args.asymmetric else [True]:
+                case = run_case(
+                    n_stores, capacity, max_intermediate, symmetric,
+                    not args.no_solve, args.time_limit, args.seed, args.neighbors,
+                )
+                print(
+                    f"{n_stores:>4} stores  cap {capacity}  {'sym ' if symmetric else 'asym'}  "
+                    f"pruned {case[0]['extensions_pruned']} extensions over capacity, "
+                    f"skipped {case[0]['candidates_skipped']} non-candidates"
+                )
+                for row in case:
+                    print(
+                        f"{row['stores']:>4} stores  cap {row['capacity']}  "
+                        f"{'sym ' if row['symmetric'] else 'asym'}  {row['routes']:>8} routes  "
+                        f"{row['stage']:<24}{row['seconds']:8.3f} s"
+                    )
+                results.extend(case)
+
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        output["regressions"] = regressions
+    Path(args.out).write_text(json.dumps(output, indent=2))
+    print(f"Saved {len(results)} timings to {args.out}")
+
+    if args.baseline and output["regressions"]:
+        for row in output["regressions"]:
+            print(
+                f"REGRESSION {row['stores']} stores cap {row['capacity']} {row['stage']}: "
+                f"{row['seconds']:.3f} s vs {row['baseline_seconds']:.3f} s"
+            )
+        sys.exit(1)
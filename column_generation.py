@@ -0,0 +1,226 @@
+import importlib
+import time
+
+import pandas as pd
+import pulp
+
+import van_schedule_solver
+from store_data import DEPOT, MAX_DEMAND_EXTRA, MAX_DEMAND_STANDARD, MAX_INTERMEDIATE, UNLOAD_MINUTES_PER_BOX
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+# Reduced costs above this are treated as zero
+EPS = 1e-6
+
+
+def ww_route_cost(total_seconds):
+    return route_cost.compute_costs(total_seconds)[4]
+
+
+def sub60_route_cost(total_seconds):
+    return van_schedule_solver.SUB60_ROUTE_COST
+
+
+def price_routes(
+    durations,
+    demand,
+    stores,
+    duals,
+    max_demand,
+    cost_of,
+    van_dual=0.0,
+    depot=DEPOT,
+    max_intermediate=MAX_INTERMEDIATE,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    max_routes=50,
+):
+    """
+    Find routes with negative reduced cost for the current cover duals.
+
+    Capacity-constrained shortest path over the duration matrix: labels are
+    (set of visited stores, last store) extended one store at a time, keeping
+    only the fastest label per pair. A label is dropped once even the best
+    case (its cost so far, minus the duals it could still collect within
+    max_intermediate stops) cannot make a negative reduced cost, since
+    cost_of never decreases as the route gets longer.
+
+    Args:
+        durations: DurationMatrix.
+        demand: dictionary mapping the expected demand to the relevant store.
+        stores: stores that may be visited.
+        duals: store -> dual value of its Cover constraint.
+        max_demand (int): The maximum demand per route.
+        cost_of: function total seconds -> route cost.
+        van_dual: dual of the van capacity row times the route's coefficient in it.
+        max_routes (int): Keep only this many of the most negative routes.
+
+    Returns:
+        list of (reduced_cost, path, total_seconds), most negative first.
+    """
+    unload_per_box = unload_minutes_per_box * 60.0
+    index = [durations.index_of(store) for store in stores]
+    depot_index = durations.index_of(depot)
+    matrix = durations.array
+    boxes = [demand[store] for store in stores]
+    pi = [duals[store] for store in stores]
+    # stores by decreasing dual, for the bound on what is left to collect
+    by_dual = sorted((i for i in range(len(stores)) if pi[i] > 0), key=lambda i: -pi[i])
+
+    def best_remaining(mask, load, slots):
+        total = 0.0
+        for i in by_dual:
+            if slots == 0:
+                break
+            if not mask & (1 << i) and load + boxes[i] <= max_demand:
+                total += pi[i]
+                slots -= 1
+        return total
+
+    found = {}
+    # label: (mask, last) -> (travel seconds, load, dual sum, path)
+    layer = {}
+    for i in range(len(stores)):
+        leg = matrix[depot_index, index[i]]
+        if boxes[i] <= max_demand and leg == leg:
+            layer[(1 << i, i)] = (float(leg), boxes[i], pi[i], [stores[i]])
+
+    for size in range(1, max_intermediate + 1):
+        next_layer = {}
+        for (mask, last), (travel, load, dual_sum, path) in layer.items():
+            back = matrix[index[last], depot_index]
+            if back == back:
+                total_seconds = travel + back + load * unload_per_box
+                reduced = cost_of(total_seconds) - dual_sum - van_dual
+                if reduced < -EPS and (mask not in found or reduced < found[mask][0]):
+                    found[mask] = (reduced, [depot] + path + [depot], total_seconds)
+
+            if size == max_intermediate:
+                continue
+            bound = cost_of(travel + load * unload_per_box) - dual_sum - van_dual
+            if bound - best_remaining(mask, load, max_intermediate - size) >= -EPS:
+                continue
+            for j in range(len(stores)):
+                if mask & (1 << j) or load + boxes[j] > max_demand:
+                    continue
+                leg = matrix[index[last], index[j]]
+                if leg != leg:
+                    continue
+                key = (mask | (1 << j), j)
+                if key not in next_layer or travel + leg < next_layer[key][0]:
+                    next_layer[key] = (travel + leg, load + boxes[j], dual_sum + pi[j], path + [stores[j]])
+        layer = next_layer
+
+    return sorted(found.values(), key=lambda item: item[0])[:max_routes]
+
+
+def solve_column_generation(
+    durations,
+    demand,
+    depot=DEPOT,
+    max_demand_standard=MAX_DEMAND_STANDARD,
+    max_demand_extra=MAX_DEMAND_EXTRA,
+    max_intermediate=MAX_INTERMEDIATE,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    daily_van_cost=van_schedule_solver.DAILY_VAN_COST,
+    routes_per_round=50,
+    max_rounds=200,
+    msg=False,
+):
+    """
+    Solve the van scheduling model without enumerating every route.
+
+    Starts from single-store routes, then alternates between the LP
+    relaxation of the restricted model and pricing new WW and SUB60 routes
+    with its duals until no route has negative reduced cost. The integer
+    model is finally solved over the generated routes only, so the result is
+    the best schedule among those routes.
+
+    Returns a dict with status, objective, lp_bound, converged, vans,
+    rounds, the generated routes table and the chosen routes table.
+    converged is False when max_rounds ran out with routes still being
+    priced in; lp_bound (the LP optimum, a lower bound on the full model)
+    is then None, as the restricted LP only bounds the generated routes.
+    """
+    stores = [store for store in demand if store != depot]
+    unload_per_box = unload_minutes_per_box * 60.0
+    for store in stores:
+        if demand[store] > max_demand_standard:
+            raise ValueError(f"{store} needs {demand[store]} boxes, more than a van holds.")
+
+    van_types = [("WW", max_demand_standard, ww_route_cost), ("SUB60", max_demand_extra, sub60_route_cost)]
+    columns = []
+    seen = set()
+
+    def add_column(path, total_seconds, van_type, cost_of):
+        route = "->".join(path)
+        if (route, van_type) not in seen:
+            seen.add((route, van_type))
+            columns.append({"route": route, "total_cost": cost_of(total_seconds), "van_type": van_type})
+            return True
+        return False
+
+    # Restricted pool: every store on its own route
+    for store in stores:
+        path = [depot, store, depot]
+        out, back = durations.seconds(depot, store), durations.seconds(store, depot)
+        if out is None or back is None:
+            raise ValueError(f"{store} has no travel time to or from {depot} in the duration matrix.")
+        travel = out + back
+        for van_type, max_demand, cost_of in van_types:
+            if demand[store] <= max_demand:
+                add_column(path, travel + demand[store] * unload_per_box, van_type, cost_of)
+
+    start = time.perf_counter()
+    lp_bound = None
+    converged = False
+    rounds = 0
+    while rounds < max_rounds:
+        rounds += 1
+        model, x, V, tours, cover = van_schedule_solver.build_model(pd.DataFrame(columns), daily_van_cost)
+        for variable in model.variables():
+            variable.cat = pulp.LpContinuous
+        model.solve(pulp.PULP_CBC_CMD(msg=msg))
+        lp_bound = pulp.value(model.objective)
+
+        duals = {store: cover[store].pi for store in stores}
+        van_dual = model.constraints["WW_VanCapacity"].pi
+        added = 0
+        for van_type, max_demand, cost_of in van_types:
+            priced = price_routes(
+                durations,
+                demand,
+                stores,
+                duals,
+                max_demand,
+                cost_of,
+                van_dual=van_dual if van_type == "WW" else 0.0,
+                depot=depot,
+                max_intermediate=max_intermediate,
+                unload_minutes_per_box=unload_minutes_per_box,
+                max_routes=routes_per_round,
+            )
+            for _, path, total_seconds in priced:
+                added += add_column(path, total_seconds, van_type, cost_of)
+        if msg:
+            print(f"Round {rounds}: LP {lp_bound:.2f}, {added} routes added, {len(columns)} in pool")
+        if added == 0:
+            converged = True
+            break
+    pricing_seconds = time.perf_counter() - start
+
+    # Integer solve over the generated routes
+    routes_df = pd.DataFrame(columns)
+    model, x, V, tours, cover = van_schedule_solver.build_model(routes_df, daily_van_cost)
+    model.solve(pulp.PULP_CBC_CMD(msg=msg))
+    chosen = [r for r in range(len(routes_df)) if pulp.value(x[r]) > 0.5]
+    return {
+        "status": pulp.LpStatus[model.status],
+        "objective": pulp.value(model.objective),
+        "lp_bound": lp_bound if converged else None,
+        "converged": converged,
+        "vans": pulp.value(V),
+        "rounds": rounds,
+        "pricing_seconds": pricing_seconds,
+        "routes": routes_df,
+        "chosen": routes_df.iloc[chosen].reset_index(drop=True),
+    }
@@ -1,47 +1,16 @@
-import numpy as np
-import pandas as pd
 import route_gen
+import duration_engine
+import instrumentation
+from duration_matrix import DurationMatrix
 
 def find_duration(tours, duration_data, index, demand_total):
-    duration = np.zeros(len(tours))
-    tour_number = 0
-    for tour in tours:
-        nodes = tour.split('->')
-        route_demand = demand_total[tour_number]
-        prev = "CentrePort Wellington"
-        for node in nodes:
-            prev_index = index[prev]
-            node_index = index[node]
-            duration[tour_number] += duration_data.iloc[prev_index, node_index+1]
-            prev = node
-        duration[tour_number] += 15 * 60 * route_demand
-        tour_number += 1
-    return duration
+    # All legs of all tours in one vectorized pass, see duration_engine
+    with instrumentation.stage("find_duration", tours=len(tours)):
+        return duration_engine.find_duration(tours, duration_data, index, demand_total)
 
 if __name__ == '__main__':
-    duration_dataset = pd.read_csv("WoolworthsDurations2025.csv")
-    index = {
-        "Woolworths Aotea" : 0,
-        "Woolworths Crofton Downs" : 1,
-        "Woolworths Johnsonville" : 2,
-        "Woolworths Johnsonville Mall" : 3,
-        "Woolworths Karori" : 4,
-        "Woolworths Kilbirnie" : 5,
-        "Woolworths Lower Hutt" : 6,
-        "Woolworths Maidstone" : 7,
-        "Woolworths Newtown" : 8,
-        "Woolworths Petone" : 9,
-        "Woolworths Porirua" : 10,
-        "Woolworths Queensgate" : 11,
-        "Woolworths Tawa" : 12,
-        "Woolworths Upper Hutt" : 13,
-        "Woolworths Wainuiomata" : 14,
-        "FreshChoice Cuba Street" : 15,
-        "FreshChoice Woburn" : 16,
-        "FreshChoice Cannons Creek" : 17,
-        "Metro Cable Car Lane" : 18,
-        "CentrePort Wellington" : 19,
-    }
+    durations = DurationMatrix.from_csv("WoolworthsDurations2025.csv")
+    index = durations.index
     nodes = {"FreshChoice Cannons Creek",
              "FreshChoice Cuba Street",
              "FreshChoice Woburn",
@@ -112,5 +81,5 @@ if __name__ == '__main__':
 
     weekday_standard_tours, demand_total = route_gen.generate_tours(nodes=nodes, demand=demand_weekdays, start=start,
                                             max_demand_per_route=max_demand_per_route, filename="weekdays_standard.txt")
-    duration = find_duration(weekday_standard_tours, duration_dataset, index, demand_total)
+    duration = find_duration(weekday_standard_tours, durations.array, index, demand_total)
     print(duration)
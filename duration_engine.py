@@ -0,0 +1,104 @@
+import numpy as np
+
+
+def encode_tours(tours, index, prefix=None, pad=0):
+    """
+    Encode tours as a padded integer array of matrix indices.
+
+    Args:
+        tours: iterable of "->"-joined route strings or lists of stop names.
+        index: dictionary mapping a stop name to its row/column in the matrix.
+        prefix: optional stop name put in front of every tour.
+        pad: index used to fill the tail of shorter tours (masked out later).
+
+    Returns:
+        (stops, lengths) where stops is an (n_tours, max_len) int array and
+        lengths holds the real number of stops of each tour.
+    """
+    paths = [tour.split("->") if isinstance(tour, str) else tour for tour in tours]
+    if prefix is not None:
+        paths = [[prefix] + list(path) for path in paths]
+
+    lengths = np.fromiter((len(path) for path in paths), dtype=np.int64, count=len(paths))
+    flat = np.fromiter(
+        (index[node] for path in paths for node in path), dtype=np.int64, count=int(lengths.sum())
+    )
+    stops = np.full((len(paths), int(lengths.max(initial=0))), pad, dtype=np.int64)
+    # column of every stop within its own tour
+    cols = np.arange(flat.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    stops[np.repeat(np.arange(len(paths)), lengths), cols] = flat
+    return stops, lengths
+
+
+def as_matrix(duration_data):
+    """Dense float64 matrix from the durations CSV frame (first column is the origin name) or an array."""
+    if hasattr(duration_data, "iloc"):
+        duration_data = duration_data.iloc[:, 1:].to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(duration_data, dtype=np.float64)
+
+
+def travel_seconds(matrix, stops, lengths):
+    """Sum every leg of every tour in one fancy-indexing pass over the matrix."""
+    if stops.shape[1] < 2:
+        return np.zeros(len(stops))
+    legs = matrix[stops[:, :-1], stops[:, 1:]]
+    # leg k exists when the tour has more than k + 1 stops
+    in_tour = np.arange(1, stops.shape[1]) < lengths[:, None]
+    return np.where(in_tour, legs, 0.0).sum(axis=1)
+
+
+def timed_travel_seconds(tensor, slice_seconds, stops, lengths, demand, unload_minutes_per_box=15, departure_seconds=0.0):
+    """
+    Travel of every tour through a (time slice, origin, destination) tensor.
+
+    Each tour leaves its first stop at departure_seconds (a scalar or one
+    per tour); every leg is read from the slice the clock is in when the
+    leg starts (clamped to the last slice), and the clock then moves on by
+    the leg and by the unloading at the stop reached, if it is an
+    intermediate one. All tours are stepped together, one leg at a time.
+    """
+    n_tours, width = stops.shape
+    travel = np.zeros(n_tours)
+    if width < 2:
+        return travel
+    clock = np.zeros(n_tours) + departure_seconds
+    unload = np.asarray(demand, dtype=np.float64)[stops] * (unload_minutes_per_box * 60.0)
+    last_slice = tensor.shape[0] - 1
+    for k in range(width - 1):
+        in_tour = k + 1 < lengths
+        # a tour with a missing leg is NaN already; keep its slice index valid
+        slices = np.minimum(np.nan_to_num(clock) // slice_seconds, last_slice).astype(np.int64)
+        leg = np.where(in_tour, tensor[slices, stops[:, k], stops[:, k + 1]], 0.0)
+        travel += leg
+        # unload at the stop just reached unless it is the final depot
+        clock += leg + np.where(k + 2 < lengths, unload[:, k + 1], 0.0)
+    return travel
+
+
+def unloading_seconds(demand, stops, lengths, unload_minutes_per_box=15):
+    """Unloading time of the intermediate stops, demand being a per-index box count vector."""
+    positions = np.arange(stops.shape[1])
+    # first and last stops are the depot
+    intermediate = (positions > 0) & (positions < lengths[:, None] - 1)
+    boxes = np.where(intermediate, np.asarray(demand)[stops], 0).sum(axis=1)
+    return boxes * unload_minutes_per_box * 60.0
+
+
+def lookup_matrix(lookup):
+    """Turn a (origin, destination) -> seconds dict into (index, matrix), NaN where there is no leg."""
+    names = sorted({a for a, _ in lookup} | {b for _, b in lookup})
+    index = {name: i for i, name in enumerate(names)}
+    matrix = np.full((len(names), len(names)), np.nan)
+    for (a, b), seconds in lookup.items():
+        matrix[index[a], index[b]] = seconds
+    return index, matrix
+
+
+def find_duration(tours, duration_data, index, demand_total, start="CentrePort Wellington"):
+    """
+    Vectorized find_duration: travel of every tour from the start plus
+    15 minutes per box of the tour's total demand.
+    """
+    stops, lengths = encode_tours(tours, index, prefix=start)
+    duration = travel_seconds(as_matrix(duration_data), stops, lengths)
+    return duration + 15 * 60 * np.asarray(demand_total, dtype=np.float64)
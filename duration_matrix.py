@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+import duration_engine
+
+# Names used in route files -> names used in the durations CSV
+ALIASES = {"Centre Port": "CentrePort Wellington"}
+
+CACHE_DIR_NAME = ".duration_cache"
+
+
+def normalize_name(name, aliases=ALIASES):
+    name = str(name).strip()
+    return aliases.get(name, name)
+
+
+class DurationMatrix:
+    """
+    Travel seconds between every pair of locations, held as one contiguous
+    float64 array with a name -> index map.
+
+    Build it with DurationMatrix.from_csv, which parses the durations CSV
+    once and afterwards memory-maps a binary copy keyed by the CSV's content.
+    Missing legs are NaN.
+    """
+
+    def __init__(self, names, array, aliases=None):
+        self.names = [str(name).strip() for name in names]
+        self.array = array
+        self.aliases = dict(ALIASES if aliases is None else aliases)
+        if self.array.shape != (len(self.names), len(self.names)):
+            raise ValueError("Duration matrix must be square with one row per name.")
+
+        self.index = _name_index(self.names, self.aliases)
+
+    @classmethod
+    def from_csv(cls, matrix_csv, cache_dir=None, aliases=None, use_cache=True):
+        """
+        Load the durations CSV (first column is the origin, one column per
+        destination), going through the on-disk cache unless use_cache is False.
+        """
+        matrix_csv = Path(matrix_csv)
+        if not use_cache:
+            return cls(*_parse_csv(matrix_csv), aliases=aliases)
+
+        cache_dir = Path(cache_dir) if cache_dir is not None else matrix_csv.parent / CACHE_DIR_NAME
+        key = hashlib.sha256(matrix_csv.read_bytes()).hexdigest()[:16]
+        array_path = cache_dir / f"{matrix_csv.stem}-{key}.npy"
+        names_path = cache_dir / f"{matrix_csv.stem}-{key}.json"
+
+        if array_path.exists() and names_path.exists():
+            names = json.loads(names_path.read_text())
+            return cls(names, np.load(array_path, mmap_mode="r"), aliases=aliases)
+
+        names, array = _parse_csv(matrix_csv)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # write to temporary files first so a half-written cache is never picked up
+        tmp_array = array_path.with_suffix(".npy.tmp")
+        with open(tmp_array, "wb") as f:
+            np.save(f, array)
+        tmp_names = names_path.with_suffix(".json.tmp")
+        tmp_names.write_text(json.dumps(names))
+        os.replace(tmp_array, array_path)
+        os.replace(tmp_names, names_path)
+        return cls(names, np.load(array_path, mmap_mode="r"), aliases=aliases)
+
+    def to_shared(self):
+        """
+        Copy the array into a new shared memory block for worker processes.
+
+        Returns (shm, spec): keep shm open (and unlink it) in the owning
+        process, and hand the small picklable spec to DurationMatrix.attach.
+        """
+        from multiprocessing import shared_memory
+
+        array = np.asarray(self.array, dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=np.float64, buffer=shm.buf)[:] = array
+        spec = {"shm": shm.name, "names": self.names, "aliases": self.aliases}
+        return shm, spec
+
+    @classmethod
+    def attach(cls, spec):
+        """
+        Zero-copy DurationMatrix over a block made by to_shared. Returns
+        (shm, durations); shm must stay referenced while durations is used.
+        """
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(name=spec["shm"])
+        n = len(spec["names"])
+        array = np.ndarray((n, n), dtype=np.float64, buffer=shm.buf)
+        array.flags.writeable = False
+        return shm, cls(spec["names"], array, aliases=spec["aliases"])
+
+    def fingerprint(self):
+        """Content hash of the names and travel times, for keying caches built from this matrix."""
+        digest = hashlib.sha256(json.dumps(self.names).encode())
+        digest.update(np.ascontiguousarray(self.array, dtype=np.float64).tobytes())
+        return digest.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.names)
+
+    def index_of(self, name):
+        return self.index[normalize_name(name, self.aliases)]
+
+    def seconds(self, a, b):
+        """Travel seconds from a to b, or None if the matrix has no such leg."""
+        value = self.array[self.index_of(a), self.index_of(b)]
+        return None if np.isnan(value) else float(value)
+
+    def vector(self, values, default=0.0):
+        """Per-row array from a name -> value dict (e.g. demand), under any spelling of the name."""
+        out = np.full(len(self.names), default, dtype=np.float64)
+        for name, value in values.items():
+            out[self.index_of(name)] = value
+        return out
+
+    def lookup(self):
+        """The (origin, destination) -> seconds dict that build_lookup used to produce."""
+        rows, cols = np.nonzero(~np.isnan(self.array))
+        values = self.array[rows, cols].tolist()
+        return {
+            (self.names[o], self.names[d]): value
+            for o, d, value in zip(rows.tolist(), cols.tolist(), values)
+        }
+
+    def encode(self, tours, prefix=None):
+        """Padded index array and lengths for tours given as route strings or stop lists."""
+        return duration_engine.encode_tours(tours, self.index, prefix=prefix)
+
+
+class DurationTensor:
+    """
+    Time-of-day travel seconds: one duration matrix per departure time
+    slice, held as a (slices, n, n) float64 array. Slice t covers clock
+    times [t, t + 1) * slice_minutes from the start of the day's planning
+    horizon; later times use the last slice.
+
+    Build it from one durations CSV per slice (from_csvs) or by scaling a
+    static DurationMatrix by a congestion factor per slice (from_profile).
+    """
+
+    def __init__(self, names, array, slice_minutes, aliases=None):
+        self.names = [str(name).strip() for name in names]
+        self.array = np.ascontiguousarray(array, dtype=np.float64)
+        self.slice_minutes = float(slice_minutes)
+        self.aliases = dict(ALIASES if aliases is None else aliases)
+        if self.array.ndim != 3 or self.array.shape[1:] != (len(self.names), len(self.names)):
+            raise ValueError("Duration tensor must be (slices, n, n) with one row per name.")
+        self.index = _name_index(self.names, self.aliases)
+
+    @classmethod
+    def from_csvs(cls, matrix_csvs, slice_minutes, aliases=None):
+        """One durations CSV per slice, in time order, all over the same locations."""
+        matrices = [DurationMatrix.from_csv(path, aliases=aliases) for path in matrix_csvs]
+        names = matrices[0].names
+        for path, matrix in zip(matrix_csvs, matrices):
+            if matrix.names != names:
+                raise ValueError(f"{path}: locations differ from {matrix_csvs[0]}.")
+        return cls(names, np.stack([matrix.array for matrix in matrices]), slice_minutes, aliases=aliases)
+
+    @classmethod
+    def from_profile(cls, durations, factors, slice_minutes):
+        """The static matrix scaled by factors[t] in slice t."""
+        array = np.asarray(factors, dtype=np.float64)[:, None, None] * np.asarray(durations.array)
+        return cls(durations.names, array, slice_minutes, aliases=durations.aliases)
+
+    @property
+    def slice_seconds(self):
+        return self.slice_minutes * 60.0
+
+    def __len__(self):
+        return len(self.names)
+
+    def index_of(self, name):
+        return self.index[normalize_name(name, self.aliases)]
+
+    def at(self, minutes):
+        """The DurationMatrix in force at a clock time."""
+        t = min(int(minutes // self.slice_minutes), len(self.array) - 1)
+        return DurationMatrix(self.names, self.array[t], aliases=self.aliases)
+
+
+def _name_index(names, aliases):
+    # every spelling that can turn up in a route, including aliases
+    index = {name: i for i, name in enumerate(names)}
+    for alias, name in aliases.items():
+        if name in index:
+            index[alias] = index[name]
+    return index
+
+
+def _parse_csv(matrix_csv):
+    # pandas is only needed on a cache miss
+    import pandas as pd
+
+    df = pd.read_csv(matrix_csv)
+    names = [str(name).strip() for name in df.iloc[:, 0]]
+    columns = [str(column).strip() for column in df.columns[1:]]
+    if sorted(columns) != sorted(names):
+        raise ValueError(f"{matrix_csv}: origins and destinations do not match.")
+
+    values = df.iloc[:, 1:].to_numpy(dtype=np.float64)
+    # put destinations in the same order as the origins
+    order = [columns.index(name) for name in names]
+    return names, np.ascontiguousarray(values[:, order])
@@ -0,0 +1,311 @@
+"""
+Fast heuristic van schedule for intraday re-planning.
+
+Builds WW routes straight from the duration matrix with Clarke-Wright
+savings, then improves them with relocate, swap, 2-opt and van-type moves
+until no move helps. While time is left it kicks the best schedule with a
+few random relocations and descends again, keeping the best schedule seen
+(so stopping at any time gives an answer). Routes are costed exactly as
+the MIP costs them: compute_costs on travel plus unloading for WW routes,
+the flat SUB60 rate for SUB60 routes, plus the daily cost of one WW van
+per two WW routes.
+
+The result can seed van_schedule_solver.SolverSession as a MIP start with
+warm_start().
+
+    python heuristic_planner.py --time-limit 0.5 --mip
+"""
+import importlib
+import math
+import random
+import time
+
+import numpy as np
+
+import van_schedule_solver
+from store_data import (
+    DEPOT,
+    MAX_DEMAND_EXTRA,
+    MAX_DEMAND_STANDARD,
+    MAX_INTERMEDIATE,
+    UNLOAD_MINUTES_PER_BOX,
+)
+from tour_set import SEPARATOR
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+VAN_TYPES = ("WW", "SUB60")
+
+
+class HeuristicPlanner:
+    """
+    Savings plus local search over the stores in demand (every store other
+    than the depot is visited once, as in the MIP).
+    """
+
+    def __init__(
+        self,
+        durations,
+        demand,
+        depot=DEPOT,
+        max_demand_standard=MAX_DEMAND_STANDARD,
+        max_demand_extra=MAX_DEMAND_EXTRA,
+        max_intermediate=MAX_INTERMEDIATE,
+        unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+        cost_params=None,
+        daily_van_cost=van_schedule_solver.DAILY_VAN_COST,
+        sub60_route_cost=van_schedule_solver.SUB60_ROUTE_COST,
+    ):
+        self.depot = depot
+        self.stores = [store for store in demand if store != depot]
+        # local node 0 is the depot, store i is node i + 1
+        nodes = [durations.index_of(depot)] + [durations.index_of(store) for store in self.stores]
+        self.seconds = durations.array[np.ix_(nodes, nodes)].tolist()
+        self.boxes = [0] + [demand[store] for store in self.stores]
+        self.capacity = {"WW": max_demand_standard, "SUB60": max_demand_extra}
+        self.max_intermediate = max_intermediate
+        self.unload_seconds = unload_minutes_per_box * 60.0
+        self.cost_params = dict(cost_params or {})
+        self.daily_van_cost = daily_van_cost
+        self.sub60_route_cost = sub60_route_cost
+
+    def route_seconds(self, route):
+        total = 0.0
+        prev = 0
+        for node in route:
+            total += self.seconds[prev][node]
+            prev = node
+        total += self.seconds[prev][0]
+        return total + sum(self.boxes[node] for node in route) * self.unload_seconds
+
+    def route_cost(self, route, van_type):
+        """Cost of one route (local node numbers) on one van type; inf if it does not fit."""
+        if not route:
+            return 0.0
+        if len(route) > self.max_intermediate or sum(self.boxes[node] for node in route) > self.capacity[van_type]:
+            return math.inf
+        seconds = self.route_seconds(route)
+        if math.isnan(seconds):
+            return math.inf
+        if van_type == "SUB60":
+            return float(self.sub60_route_cost)
+        return float(route_cost.compute_costs(seconds, **self.cost_params)[4])
+
+    def van_cost(self, types):
+        return self.daily_van_cost * math.ceil(sum(1 for t in types if t == "WW") / 2)
+
+    def savings(self):
+        """Clarke-Wright savings: merge WW routes end to start while it lowers the cost."""
+        n = len(self.stores)
+        routes = {i: [i] for i in range(1, n + 1)}
+        costs = {i: self.route_cost([i], "WW") for i in routes}
+        route_of = {i: i for i in routes}
+        d = self.seconds
+        pairs = sorted(
+            ((d[i][0] + d[0][j] - d[i][j], i, j) for i in routes for j in routes if i != j),
+            reverse=True,
+        )
+        for saving, i, j in pairs:
+            # NaN savings (missing legs) compare false and are skipped
+            if not saving > 0:
+                continue
+            a, b = route_of[i], route_of[j]
+            if a == b or routes[a][-1] != i or routes[b][0] != j:
+                continue
+            merged = routes[a] + routes[b]
+            cost = self.route_cost(merged, "WW")
+            # one route fewer frees half a van
+            if cost >= costs[a] + costs[b] + self.daily_van_cost / 2:
+                continue
+            routes[a] = merged
+            costs[a] = cost
+            for node in routes.pop(b):
+                route_of[node] = a
+            del costs[b]
+        return list(routes.values()), ["WW"] * len(routes)
+
+    def _moves(self, routes, types):
+        """Every neighbouring schedule as {route index: (new route, van type)}; index len(routes) is a new route."""
+        count = len(routes)
+        for a, route in enumerate(routes):
+            # van type
+            for van_type in VAN_TYPES:
+                if van_type != types[a]:
+                    yield {a: (route, van_type)}
+            # 2-opt: reverse a segment
+            for i in range(len(route) - 1):
+                for j in range(i + 1, len(route)):
+                    yield {a: (route[:i] + route[i : j + 1][::-1] + route[j + 1 :], types[a])}
+            # relocate one store, within the route, into another or into a new route
+            for i, node in enumerate(route):
+                rest = route[:i] + route[i + 1 :]
+                for p in range(len(rest) + 1):
+                    if p != i:
+                        yield {a: (rest[:p] + [node] + rest[p:], types[a])}
+                for b in range(count):
+                    if b != a:
+                        for p in range(len(routes[b]) + 1):
+                            yield {a: (rest, types[a]), b: (routes[b][:p] + [node] + routes[b][p:], types[b])}
+                if rest:
+                    for van_type in VAN_TYPES:
+                        yield {a: (rest, types[a]), count: ([node], van_type)}
+            # swap two stores between routes
+            for b in range(a + 1, count):
+                for i in range(len(route)):
+                    for j in range(len(routes[b])):
+                        new_a, new_b = list(route), list(routes[b])
+                        new_a[i], new_b[j] = new_b[j], new_a[i]
+                        yield {a: (new_a, types[a]), b: (new_b, types[b])}
+
+    def improve(self, routes, types, deadline=None):
+        """First-improvement descent over all moves, stopping at deadline; returns (routes, types, cost)."""
+        routes, types = [list(route) for route in routes], list(types)
+        costs = [self.route_cost(route, van_type) for route, van_type in zip(routes, types)]
+        improved = True
+        while improved and (deadline is None or time.perf_counter() < deadline):
+            improved = False
+            for change in self._moves(routes, types):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                new_types = list(types) + [None]
+                for k, (_, van_type) in change.items():
+                    new_types[k] = van_type
+                # an emptied route no longer needs a van
+                for k, (route, _) in change.items():
+                    if not route:
+                        new_types[k] = None
+                delta = sum(
+                    self.route_cost(route, van_type) - (costs[k] if k < len(costs) else 0.0)
+                    for k, (route, van_type) in change.items()
+                )
+                if delta == math.inf or math.isnan(delta):
+                    continue
+                if delta + self.van_cost(new_types) - self.van_cost(types) < -1e-9:
+                    for k, (route, van_type) in change.items():
+                        if k == len(routes):
+                            routes.append(route)
+                            types.append(van_type)
+                            costs.append(self.route_cost(route, van_type))
+                        else:
+                            routes[k], types[k] = route, van_type
+                            costs[k] = self.route_cost(route, van_type)
+                    keep = [k for k, route in enumerate(routes) if route]
+                    routes = [routes[k] for k in keep]
+                    types = [types[k] for k in keep]
+                    costs = [costs[k] for k in keep]
+                    improved = True
+                    break
+        return routes, types, sum(costs) + self.van_cost(types)
+
+    def _kick(self, routes, types, rng, moves=3):
+        """Move a few random stores to random feasible positions."""
+        routes, types = [list(route) for route in routes], list(types)
+        for _ in range(moves):
+            a = rng.randrange(len(routes))
+            if not routes[a]:
+                continue
+            i = rng.randrange(len(routes[a]))
+            node = routes[a].pop(i)
+            b = rng.randrange(len(routes) + 1)
+            if b == len(routes):
+                routes.append([])
+                types.append("WW")
+            routes[b].insert(rng.randrange(len(routes[b]) + 1), node)
+            if self.route_cost(routes[b], types[b]) == math.inf:
+                # put it back where it was
+                routes[b].remove(node)
+                routes[a].insert(i, node)
+        keep = [k for k, route in enumerate(routes) if route]
+        return [routes[k] for k in keep], [types[k] for k in keep]
+
+    def solve(self, time_limit=0.5, seed=None, kick_moves=3):
+        """
+        Savings, descent, then kicks and descents until time_limit seconds
+        have passed. Always returns the best schedule found.
+
+        Returns a dict with objective, vans, routes (route strings),
+        van_types, costs (per route), history ((seconds, objective) at
+        every improvement) and iterations.
+        """
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+        rng = random.Random(seed)
+
+        routes, types = self.savings()
+        routes, types, cost = self.improve(routes, types, deadline=deadline)
+        best = (routes, types, cost)
+        history = [(time.perf_counter() - start, cost)]
+        iterations = 0
+        while deadline is not None and time.perf_counter() < deadline:
+            iterations += 1
+            kicked = self._kick(best[0], best[1], rng, kick_moves)
+            routes, types, cost = self.improve(*kicked, deadline=deadline)
+            if cost < best[2] - 1e-9:
+                best = (routes, types, cost)
+                history.append((time.perf_counter() - start, cost))
+
+        routes, types, cost = best
+        return {
+            "objective": cost,
+            "vans": math.ceil(sum(1 for t in types if t == "WW") / 2),
+            "routes": [self.route_string(route) for route in routes],
+            "van_types": types,
+            "costs": [self.route_cost(route, van_type) for route, van_type in zip(routes, types)],
+            "history": history,
+            "iterations": iterations,
+        }
+
+    def route_string(self, route):
+        return SEPARATOR.join([self.depot] + [self.stores[node - 1] for node in route] + [self.depot])
+
+
+def warm_start(session, solution):
+    """
+    Make a heuristic solution the MIP start of a SolverSession, adding any
+    of its routes the model does not have yet. Returns the route ids.
+    """
+    import pandas as pd
+
+    ids = []
+    missing = []
+    for route, van_type, cost in zip(solution["routes"], solution["van_types"], solution["costs"]):
+        r = session.route_id(route, van_type)
+        if r is None:
+            missing.append({"route": route, "total_cost": cost, "van_type": van_type})
+        else:
+            ids.append(r)
+    if missing:
+        ids += session.add_routes(pd.DataFrame(missing))
+    session.set_initial_solution(ids)
+    return ids
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from duration_matrix import DurationMatrix
+    from store_data import DEMAND_WEEKDAYS, MATRIX_CSV
+
+    parser = argparse.ArgumentParser(description="Savings + local search van schedule")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--time-limit", type=float, default=0.5, help="seconds of local search")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--mip", action="store_true", help="then solve the MIP from this schedule")
+    args = parser.parse_args()
+
+    durations = DurationMatrix.from_csv(args.matrix)
+    result = HeuristicPlanner(durations, DEMAND_WEEKDAYS).solve(args.time_limit, seed=args.seed)
+    print("Heuristic cost:", result["objective"])
+    print("Woolworths vans retained:", result["vans"])
+    print(f"{result['iterations']} kicks, best found after {result['history'][-1][0]:.3f} s")
+    for route, cost, van_type in zip(result["routes"], result["costs"], result["van_types"]):
+        print(" -", route, "| Cost:", cost, "| Van type:", van_type)
+
+    if args.mip:
+        import plan
+
+        pools = plan.costed_pools(durations, DEMAND_WEEKDAYS)
+        session = van_schedule_solver.SolverSession(plan.routes_frame(pools))
+        warm_start(session, result)
+        mip = session.solve()
+        print("MIP cost:", mip["objective"], f"({mip['solve_seconds']:.3f} s)")
@@ -0,0 +1,172 @@
+"""
+Lightweight stage timing for the planning scripts.
+
+Wrap a piece of work in `with instrumentation.stage("name"):` and add
+counters with `instrumentation.count("tours_kept", n)`. Nothing is
+recorded unless tracing is switched on, either from code with enable()
+or for any entry point with environment variables:
+
+    ROUTE_TRACE=trace.json          write a JSON trace of every stage at exit
+    ROUTE_TRACE_PROFILE=1           also run cProfile, saved next to the trace as .prof
+    ROUTE_TRACE_MEMORY=1            also measure peak Python allocations per stage (tracemalloc),
+                                    nested stages' peaks included in the enclosing stage
+
+Each stage records wall time, the process's peak resident memory so far
+(None where it cannot be read) and its counters. When tracing is off, stage() hands back a shared no-op
+object and count() returns straight away.
+"""
+import atexit
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Windows: peak_rss_mb falls back to psutil
+    resource = None
+
+_enabled = False
+_trace_path = None
+_profiler = None
+_memory = False
+_stages = []
+_open = []
+_started = None
+
+
+class _Stage:
+    def __init__(self, name, counters):
+        self.name = name
+        self.counters = dict(counters)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def __enter__(self):
+        self.parent = _open[-1].name if _open else None
+        if _memory:
+            import tracemalloc
+
+            # resetting wipes the enclosing stage's peak so far, so hand it over first
+            if _open:
+                _open[-1].peak_traced = max(_open[-1].peak_traced, tracemalloc.get_traced_memory()[1])
+            self.peak_traced = 0
+            tracemalloc.reset_peak()
+        _open.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _open.pop()
+        record = {
+            "name": self.name,
+            "parent": self.parent,
+            "start": self.start - _started,
+            "seconds": seconds,
+            "peak_rss_mb": peak_rss_mb(),
+            "counters": self.counters,
+        }
+        if _memory:
+            import tracemalloc
+
+            peak = max(self.peak_traced, tracemalloc.get_traced_memory()[1])
+            record["peak_traced_mb"] = peak / 2**20
+            if _open:
+                _open[-1].peak_traced = max(_open[-1].peak_traced, peak)
+        _stages.append(record)
+        return False
+
+
+class _NullStage:
+    def count(self, name, value=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far in MB, or None if it cannot be read."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes elsewhere
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024.0
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    return getattr(memory, "peak_wset", memory.rss) / 2**20
+
+
+def stage(name, **counters):
+    """Context manager timing one pipeline stage; a no-op unless tracing is enabled."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, counters)
+
+
+def count(name, value=1):
+    """Add to a counter of the innermost open stage."""
+    if _enabled and _open:
+        _open[-1].count(name, value)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(trace_path=None, profile=False, memory=False):
+    """Start recording. With trace_path the trace is written there when the process exits."""
+    global _enabled, _trace_path, _profiler, _memory, _started
+    _enabled = True
+    _started = time.perf_counter()
+    _trace_path = trace_path
+    if memory:
+        import tracemalloc
+
+        tracemalloc.start()
+        _memory = True
+    if profile:
+        import cProfile
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if trace_path is not None:
+        atexit.register(write_trace)
+
+
+def trace():
+    """Everything recorded so far: the stages in the order they finished and summed counters."""
+    totals = {}
+    for record in _stages:
+        for name, value in record["counters"].items():
+            if isinstance(value, (int, float)):
+                totals[name] = totals.get(name, 0) + value
+    return {"stages": list(_stages), "counters": totals}
+
+
+def write_trace(trace_path=None):
+    path = Path(trace_path or _trace_path)
+    path.write_text(json.dumps(trace(), indent=2))
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(path.with_suffix(".prof"))
+
+
+if os.environ.get("ROUTE_TRACE"):
+    enable(
+        os.environ["ROUTE_TRACE"],
+        profile=os.environ.get("ROUTE_TRACE_PROFILE") == "1",
+        memory=os.environ.get("ROUTE_TRACE_MEMORY") == "1",
+    )
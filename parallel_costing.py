@@ -0,0 +1,131 @@
+"""
+Route generation and costing spread over a process pool.
+
+The tour space is split by first stop: worker i enumerates and costs
+every tour that starts depot -> store i. Workers attach to the duration
+matrix and the demand vector through shared memory instead of receiving
+pickled copies, and the partial tables are concatenated in store-name
+order, so the merged table is the same whatever the worker count and
+whichever worker finishes first.
+
+    python parallel_costing.py --max-intermediate 5 --workers 8
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import route_gen
+import route_stream
+from duration_matrix import DurationMatrix
+from store_data import DEPOT, UNLOAD_MINUTES_PER_BOX
+
+# Set in each worker by _attach
+_durations = None
+_boxes = None
+_shms = ()
+
+
+def _share_vector(vector):
+    shm = shared_memory.SharedMemory(create=True, size=max(vector.nbytes, 1))
+    np.ndarray(vector.shape, dtype=np.float64, buffer=shm.buf)[:] = vector
+    return shm
+
+
+def _attach(matrix_spec, boxes_name):
+    global _durations, _boxes, _shms
+    matrix_shm, _durations = DurationMatrix.attach(matrix_spec)
+    boxes_shm = shared_memory.SharedMemory(name=boxes_name)
+    _boxes = np.ndarray((len(_durations),), dtype=np.float64, buffer=boxes_shm.buf)
+    _boxes.flags.writeable = False
+    _shms = (matrix_shm, boxes_shm)
+
+
+def _cost_partition(task):
+    first_stop, nodes, start, max_demand, max_intermediate, unload_minutes_per_box = task
+    demand = {node: _boxes[_durations.index_of(node)] for node in nodes}
+    paths = [
+        path
+        for path, _, _ in route_gen.enumerate_tours(
+            nodes, demand, start, max_demand, max_intermediate, first_stops={first_stop}
+        )
+    ]
+    return route_stream.cost_chunk(paths, _durations, _boxes, unload_minutes_per_box)
+
+
+def parallel_cost_columns(
+    durations,
+    nodes,
+    demand,
+    max_demand,
+    start=DEPOT,
+    max_intermediate=4,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    workers=None,
+):
+    """
+    RouteCost&Duration.cost_columns for every capacity-feasible tour over
+    nodes, generated and costed by first stop across worker processes.
+
+    Tours are in store-name order of their first stop, then in
+    enumeration order within it.
+    """
+    nodes = sorted(set(nodes) | {start})
+    stores = [node for node in nodes if node != start]
+    tasks = [(store, nodes, start, max_demand, max_intermediate, unload_minutes_per_box) for store in stores]
+
+    matrix_shm, matrix_spec = durations.to_shared()
+    boxes_shm = _share_vector(durations.vector(demand))
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_attach,
+            initargs=(matrix_spec, boxes_shm.name),
+        ) as pool:
+            parts = list(pool.map(_cost_partition, tasks))
+    finally:
+        for shm in (matrix_shm, boxes_shm):
+            shm.close()
+            shm.unlink()
+
+    if not parts:
+        return route_stream.cost_chunk([], durations, durations.vector(demand), unload_minutes_per_box)
+    merged = {"route": [route for part in parts for route in part["route"]]}
+    for name in parts[0]:
+        if name != "route":
+            merged[name] = np.concatenate([part[name] for part in parts])
+    return merged
+
+
+if __name__ == "__main__":
+    import argparse
+    import importlib
+
+    from store_data import DEMAND_WEEKDAYS, MATRIX_CSV, MAX_DEMAND_STANDARD
+
+    route_cost = importlib.import_module("RouteCost&Duration")
+
+    parser = argparse.ArgumentParser(description="Generate and cost routes over a process pool")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--max-demand", type=int, default=MAX_DEMAND_STANDARD, help="van capacity in boxes")
+    parser.add_argument("--max-intermediate", type=int, default=4, help="stores per route")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--formats", nargs="+", default=["csv"], choices=["csv", "parquet", "feather"])
+    parser.add_argument("--full-out", default="Routes with Duration & per box - Standard.csv")
+    parser.add_argument("--slim-out", default="Route and Total Cost - Standard.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    columns = parallel_cost_columns(
+        DurationMatrix.from_csv(args.matrix),
+        DEMAND_WEEKDAYS,
+        DEMAND_WEEKDAYS,
+        args.max_demand,
+        max_intermediate=args.max_intermediate,
+        workers=args.workers,
+    )
+    seconds = time.perf_counter() - start
+    route_cost.write_costed_tables(columns, args.full_out, args.slim_out, tuple(args.formats))
+    print(f"{len(columns['route'])} routes costed in {seconds:.2f} s ({len(columns['route']) / seconds:,.0f} routes/s)")
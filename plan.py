@@ -0,0 +1,211 @@
+"""
+Plan a day's van schedule in one process.
+
+Runs route generation, costing, model build and the CBC solve back to
+back on in-memory arrays, instead of RouteCost&Duration.py writing the
+route CSVs for van_schedule_solver.py to read back. The costed pools go
+through the route cache, so an unchanged rerun skips straight to the
+model. Nothing is written unless --out-dir is given, and pandas/pulp are
+only imported once the model is built.
+
+    python plan.py --time-limit 60
+    python plan.py --day saturdays --out-dir plan_outputs --formats csv parquet
+"""
+import argparse
+import importlib
+import time
+from pathlib import Path
+
+import instrumentation
+from store_data import (
+    DEMAND_SATURDAYS,
+    DEMAND_WEEKDAYS,
+    DEPOT,
+    MATRIX_CSV,
+    MAX_DEMAND_EXTRA,
+    MAX_DEMAND_STANDARD,
+    MAX_INTERMEDIATE,
+    UNLOAD_MINUTES_PER_BOX,
+    delivered,
+)
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+DEMANDS = {"weekdays": DEMAND_WEEKDAYS, "saturdays": DEMAND_SATURDAYS}
+
+# File names RouteCost&Duration.py and van_schedule_solver.py use, per van type
+OUTPUT_FILES = {
+    "WW": ("Routes with Duration & per box - Standard.csv", "Route and Total Cost - Standard.csv"),
+    "SUB60": ("Routes with Duration & per box - Extra.csv", "Route and Total Cost - Extra.csv"),
+}
+CHOSEN_FILE = "Chosen routes.csv"
+
+
+def costed_pools(
+    durations,
+    demand,
+    max_demand_standard=MAX_DEMAND_STANDARD,
+    max_demand_extra=MAX_DEMAND_EXTRA,
+    max_intermediate=MAX_INTERMEDIATE,
+    best_order=True,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    use_cache=True,
+    shift_minutes=route_cost.SHIFT_MINUTES,
+    base_rate_per_hr=route_cost.BASE_RATE_PER_HR,
+    ot_rate_per_hr=route_cost.OT_RATE_PER_HR,
+):
+    """
+    Cost columns (as RouteCost&Duration.cost_columns) of the WW and SUB60
+    route pools. Stores with no boxes are left out of the routes.
+    """
+    demand = delivered(demand)
+    nodes = set(demand)
+    rates = {"shift_minutes": shift_minutes, "base_rate_per_hr": base_rate_per_hr, "ot_rate_per_hr": ot_rate_per_hr}
+    capacities = {"WW": max_demand_standard, "SUB60": max_demand_extra}
+
+    pools = {}
+    if use_cache:
+        import route_cache
+
+        cache = route_cache.RouteCache()
+        for van_type, max_demand in capacities.items():
+            with instrumentation.stage("cached_cost_columns"):
+                pools[van_type] = route_cache.cached_cost_columns(
+                    cache, durations, nodes, demand, DEPOT, max_demand, max_intermediate,
+                    best_order=best_order, unload_minutes_per_box=unload_minutes_per_box, **rates,
+                )
+        return pools
+
+    lookup = durations.lookup()
+    for van_type, max_demand in capacities.items():
+        tours = route_cost.generate_tours(
+            nodes, demand, DEPOT, max_demand, max_intermediate, lookup=lookup, best_order=best_order
+        )
+        pools[van_type] = route_cost.cost_columns(tours, lookup, demand, unload_minutes_per_box, **rates)
+    return pools
+
+
+def routes_frame(pools, sub60_route_cost=None):
+    """The solver's input table (route, total_cost, van_type) straight from the cost columns."""
+    import numpy as np
+    import pandas as pd
+
+    import van_schedule_solver
+
+    if sub60_route_cost is None:
+        sub60_route_cost = van_schedule_solver.SUB60_ROUTE_COST
+    ww, sub60 = pools["WW"], pools["SUB60"]
+    return pd.DataFrame(
+        {
+            "route": list(ww["route"]) + list(sub60["route"]),
+            "total_cost": np.concatenate([ww["total_cost"], np.full(len(sub60["route"]), float(sub60_route_cost))]),
+            "van_type": ["WW"] * len(ww["route"]) + ["SUB60"] * len(sub60["route"]),
+        }
+    )
+
+
+def write_artifacts(pools, result, out_dir, formats=("csv",)):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for van_type, (full_csv, slim_csv) in OUTPUT_FILES.items():
+        route_cost.write_costed_tables(pools[van_type], out_dir / full_csv, out_dir / slim_csv, formats)
+    route_cost.write_table(result["chosen"], out_dir / CHOSEN_FILE, formats)
+
+
+def plan(
+    matrix_csv=MATRIX_CSV,
+    demand=DEMAND_WEEKDAYS,
+    max_demand_standard=MAX_DEMAND_STANDARD,
+    max_demand_extra=MAX_DEMAND_EXTRA,
+    max_intermediate=MAX_INTERMEDIATE,
+    best_order=True,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    use_cache=True,
+    time_limit=None,
+    gap_rel=None,
+    out_dir=None,
+    formats=("csv",),
+):
+    """
+    Generate, cost and solve one day's schedule without intermediate files.
+
+    Returns SolverSession.solve's result plus "routes" (pool size) and
+    "timings" (seconds per stage). With out_dir the route tables and the
+    chosen routes are also written there, in each of formats. A day with
+    no boxes to deliver needs no vans and skips the solve.
+    """
+    from duration_matrix import DurationMatrix
+
+    timings = {}
+    start = time.perf_counter()
+    durations = DurationMatrix.from_csv(matrix_csv)
+    timings["load_matrix"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pools = costed_pools(
+        durations, demand, max_demand_standard, max_demand_extra, max_intermediate,
+        best_order, unload_minutes_per_box, use_cache,
+    )
+    timings["routes"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import van_schedule_solver
+
+    routes_df = routes_frame(pools)
+    if routes_df.empty:
+        result = {
+            "status": "Optimal",
+            "objective": 0.0,
+            "best_bound": 0.0,
+            "vans": 0,
+            "chosen": routes_df.reindex(columns=["id", "route", "van_type", "total_cost"]),
+            "solve_seconds": 0.0,
+            "nodes": 0,
+            "trajectory": [],
+        }
+    else:
+        session = van_schedule_solver.SolverSession(routes_df)
+        timings["model_build"] = time.perf_counter() - start
+        result = session.solve(time_limit=time_limit, gap_rel=gap_rel)
+    timings["solve"] = result["solve_seconds"]
+
+    if out_dir is not None:
+        start = time.perf_counter()
+        write_artifacts(pools, result, out_dir, formats)
+        timings["write_outputs"] = time.perf_counter() - start
+    return {**result, "routes": len(routes_df), "timings": timings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate, cost and solve a day's van schedule in one process")
+    parser.add_argument("--day", choices=sorted(DEMANDS), default="weekdays")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--max-intermediate", type=int, default=MAX_INTERMEDIATE, help="stores per route")
+    parser.add_argument("--all-orders", action="store_true", help="keep every ordering of each store set")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate the route pools without .route_cache")
+    parser.add_argument("--time-limit", type=float, default=None, help="CBC time limit in seconds")
+    parser.add_argument("--gap", type=float, default=None, help="relative MIP gap to stop at")
+    parser.add_argument("--out-dir", default=None, help="write the route tables and chosen routes here")
+    parser.add_argument("--formats", nargs="+", default=["csv"], choices=["csv", "parquet", "feather"])
+    args = parser.parse_args()
+
+    result = plan(
+        args.matrix,
+        DEMANDS[args.day],
+        max_intermediate=args.max_intermediate,
+        best_order=not args.all_orders,
+        use_cache=not args.no_cache,
+        time_limit=args.time_limit,
+        gap_rel=args.gap,
+        out_dir=args.out_dir,
+        formats=tuple(args.formats),
+    )
+
+    print("Status:", result["status"])
+    print("Optimal cost:", result["objective"])
+    print("Woolworths vans retained:", result["vans"])
+    print("Routes in the model:", result["routes"])
+    print("Timings:", ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in result["timings"].items()))
+    print("\nChosen routes:")
+    for route, total_cost, route_van_type in result["chosen"][["route", "total_cost", "van_type"]].itertuples(index=False):
+        print(" -", route, "| Cost:", total_cost, "| Van type:", route_van_type)
@@ -0,0 +1,433 @@
+"""
+Always-warm local planning service.
+
+A long-running asyncio HTTP server in front of a pool of solver worker
+processes. Each worker attaches to the duration matrix in shared memory
+and keeps its own costed route pools (route_pool.RoutePool) and
+van_schedule_solver.SolverSession in memory, so a re-plan only patches
+the routes through the stores whose demand changed and re-solves from
+the previous solution.
+
+Endpoints (JSON in and out):
+
+    POST /plan     {"demand": {store: boxes}, "remove": [store], "daily_van_cost": ...,
+                    "sub60_route_cost": ..., "shift_minutes": ..., "base_rate_per_hr": ...,
+                    "ot_rate_per_hr": ..., "time_limit": ..., "gap": ...}
+    GET  /stats    request counts, queue depth and latency percentiles
+    GET  /health
+
+Every /plan request describes the whole day relative to the base demand
+and today's costs (anything left out takes its base value), so whichever
+worker picks it up gives the same answer. At most one request per worker
+is solved at a time; up to max_queue more wait, and beyond that the
+service answers 503. A malformed request (not a JSON object, an unknown
+store or setting, demand that is not a whole number of boxes) gets a 400
+before any worker state is touched.
+
+    python planning_service.py serve --workers 2
+    python planning_service.py plan --demand '{"Woolworths Aotea": 4}'
+"""
+import asyncio
+import importlib
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import route_pool
+import van_schedule_solver
+from duration_matrix import DurationMatrix
+from store_data import (
+    DEMAND_WEEKDAYS,
+    DEPOT,
+    MATRIX_CSV,
+    MAX_DEMAND_EXTRA,
+    MAX_DEMAND_STANDARD,
+    MAX_INTERMEDIATE,
+)
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_QUEUE = 32
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+RATE_KEYS = ("shift_minutes", "base_rate_per_hr", "ot_rate_per_hr")
+NUMBER_KEYS = ("daily_van_cost", "sub60_route_cost", *RATE_KEYS, "time_limit", "gap")
+REQUEST_KEYS = {"demand", "remove", *NUMBER_KEYS}
+
+# Set in each worker by _start_worker
+_state = None
+_shm = None
+
+
+def is_store(durations, name):
+    """Whether name is a store in the duration matrix (the depot is not)."""
+    if not isinstance(name, str):
+        return False
+    try:
+        return durations.index_of(name) != durations.index_of(DEPOT)
+    except KeyError:
+        return False
+
+
+def check_request(request, durations):
+    """Raise ValueError unless request is a well-formed /plan body over the stores in durations."""
+    if not isinstance(request, dict):
+        raise ValueError("A /plan request must be a JSON object.")
+    unknown = set(request) - REQUEST_KEYS
+    if unknown:
+        raise ValueError(f"Unknown request settings: {sorted(unknown)}")
+
+    demand = request.get("demand", {})
+    if not isinstance(demand, dict):
+        raise ValueError("demand must map store names to boxes.")
+    for store, boxes in demand.items():
+        if not is_store(durations, store):
+            raise ValueError(f"Unknown store: {store!r}")
+        if isinstance(boxes, bool) or not isinstance(boxes, int) or boxes < 0:
+            raise ValueError(f"Demand for {store} must be a whole number of boxes, not {boxes!r}.")
+
+    remove = request.get("remove", [])
+    if not isinstance(remove, list):
+        raise ValueError("remove must be a list of store names.")
+    for store in remove:
+        if not is_store(durations, store):
+            raise ValueError(f"Unknown store: {store!r}")
+
+    for key in NUMBER_KEYS:
+        value = request.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+            raise ValueError(f"{key} must be a non-negative number, not {value!r}.")
+
+
+class PlannerState:
+    """One worker's warm planning state: the two route pools and the solver session over them."""
+
+    def __init__(
+        self,
+        durations,
+        demand=DEMAND_WEEKDAYS,
+        max_demand_standard=MAX_DEMAND_STANDARD,
+        max_demand_extra=MAX_DEMAND_EXTRA,
+        max_intermediate=MAX_INTERMEDIATE,
+    ):
+        self.durations = durations
+        self.base_demand = dict(demand)
+        self.defaults = {
+            "daily_van_cost": van_schedule_solver.DAILY_VAN_COST,
+            "sub60_route_cost": van_schedule_solver.SUB60_ROUTE_COST,
+            "shift_minutes": route_cost.SHIFT_MINUTES,
+            "base_rate_per_hr": route_cost.BASE_RATE_PER_HR,
+            "ot_rate_per_hr": route_cost.OT_RATE_PER_HR,
+        }
+        self.costs = dict(self.defaults)
+        self.pools = {
+            van_type: route_pool.RoutePool.build(
+                durations, demand, max_demand, max_intermediate=max_intermediate, best_order=True
+            )
+            for van_type, max_demand in (("WW", max_demand_standard), ("SUB60", max_demand_extra))
+        }
+        ww = self.pools["WW"].to_frame()[["route", "total_cost"]].assign(van_type="WW")
+        sub60 = self.pools["SUB60"].to_frame()[["route", "total_cost"]].assign(van_type="SUB60")
+        sub60["total_cost"] = self.costs["sub60_route_cost"]
+        self.session = van_schedule_solver.SolverSession(pd.concat([ww, sub60], ignore_index=True))
+
+    def update(self, request):
+        """Bring pools and model in line with a /plan request; returns the number of stores changed."""
+        # everything is checked up front: a pool that fails half way through an update
+        # would no longer match the model
+        check_request(request, self.durations)
+        wanted = {**self.base_demand, **request.get("demand", {})}
+        for store in request.get("remove", []):
+            wanted.pop(store, None)
+        wanted[DEPOT] = self.base_demand.get(DEPOT, 0)
+        current = self.pools["WW"].demand
+        changed = 0
+
+        for store in [store for store in current if store not in wanted]:
+            for van_type, pool in self.pools.items():
+                self.session.apply_pool_change(pool.remove_store(store), van_type)
+            self.session.remove_store(store)
+            changed += 1
+        for store, boxes in wanted.items():
+            if store == DEPOT or current.get(store) == boxes:
+                continue
+            for van_type, pool in self.pools.items():
+                if store in pool.demand:
+                    change = pool.set_demand(store, boxes)
+                else:
+                    change = pool.add_store(store, boxes)
+                added = self.session.apply_pool_change(change, van_type)
+                if van_type == "SUB60":
+                    self.session.set_route_costs({r: self.costs["sub60_route_cost"] for r in added})
+            changed += 1
+
+        costs = {
+            key: default if request.get(key) is None else request[key] for key, default in self.defaults.items()
+        }
+        if costs["daily_van_cost"] != self.costs["daily_van_cost"]:
+            self.session.set_daily_van_cost(costs["daily_van_cost"])
+        if costs["sub60_route_cost"] != self.costs["sub60_route_cost"]:
+            self.session.set_route_costs(
+                {r: costs["sub60_route_cost"] for r, row in self.session.routes.items() if row["van_type"] == "SUB60"}
+            )
+        if any(costs[key] != self.costs[key] for key in RATE_KEYS):
+            self._recost({key: costs[key] for key in RATE_KEYS})
+        self.costs = costs
+        return changed
+
+    def _recost(self, rates):
+        # WW route costs from the pool's cached seconds under new rates
+        pool = self.pools["WW"]
+        pool.cost_params = dict(rates)
+        rows = list(pool.routes.values())
+        seconds = np.array([row["total_time_seconds"] for row in rows])
+        costs = route_cost.compute_costs(seconds, **rates)[4]
+        new_costs = {}
+        for row, cost in zip(rows, costs.tolist()):
+            row["total_cost"] = cost
+            r = self.session.route_id(row["route"], "WW")
+            if r is not None:
+                new_costs[r] = cost
+        self.session.set_route_costs(new_costs)
+
+
+def _start_worker(spec):
+    global _state, _shm
+    _shm, durations = DurationMatrix.attach(spec["matrix"])
+    _state = PlannerState(durations, **spec["options"])
+    # solved once here, so a worker is warm before it picks up any request
+    _state.session.solve()
+
+
+def _replan(request, arrived):
+    started = time.time()
+    clock = time.perf_counter()
+    changed = _state.update(request)
+    update_seconds = time.perf_counter() - clock
+    result = _state.session.solve(time_limit=request.get("time_limit"), gap_rel=request.get("gap"))
+    return {
+        "status": result["status"],
+        "objective": result["objective"],
+        "vans": result["vans"],
+        "routes": [
+            {"route": row["route"], "van_type": row["van_type"], "total_cost": float(row["total_cost"])}
+            for row in result["chosen"].to_dict("records")
+        ],
+        "stores_changed": changed,
+        "worker": os.getpid(),
+        "timings": {
+            "queued": started - arrived,
+            "update": update_seconds,
+            "solve": result["solve_seconds"],
+        },
+    }
+
+
+class PlanningService:
+    """The HTTP front end: request parsing, queue limit, per-request timing and stats."""
+
+    def __init__(self, matrix_csv=MATRIX_CSV, workers=None, max_queue=MAX_QUEUE, **options):
+        self.matrix_csv = matrix_csv
+        self.workers = workers or os.cpu_count()
+        self.max_queue = max_queue
+        self.options = options
+        self.durations = None
+        self.pool = None
+        self.shm = None
+        self.server = None
+        self.pending = 0
+        self.counts = {"requests": 0, "errors": 0, "rejected": 0}
+        self.latencies = deque(maxlen=1000)
+
+    async def start(self, host=HOST, port=PORT):
+        """Start the workers (each one warms itself up in _start_worker), then listen."""
+        self.durations = DurationMatrix.from_csv(self.matrix_csv)
+        self.shm, matrix_spec = self.durations.to_shared()
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_start_worker,
+            initargs=({"matrix": matrix_spec, "options": self.options},),
+        )
+        loop = asyncio.get_running_loop()
+        # the pool only starts a process when no worker is idle, so one call per
+        # worker submitted together starts all of them; each returns once warm
+        await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid) for _ in range(self.workers)))
+        self.slots = asyncio.Semaphore(self.workers)
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+
+    async def plan(self, request):
+        check_request(request, self.durations)
+        if self.pending >= self.max_queue + self.workers:
+            self.counts["rejected"] += 1
+            raise OverflowError("Planning queue is full.")
+        self.pending += 1
+        arrived = time.time()
+        clock = time.perf_counter()
+        try:
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.pool, _replan, request, arrived)
+        finally:
+            self.pending -= 1
+        result["timings"]["total"] = time.perf_counter() - clock
+        self.latencies.append(result["timings"]["total"])
+        return result
+
+    def stats(self):
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            **self.counts,
+            "workers": self.workers,
+            "in_flight": min(self.pending, self.workers),
+            "queued": max(self.pending - self.workers, 0),
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p95": float(np.percentile(latencies, 95)),
+            "latency_max": float(latencies.max()),
+        }
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "POST" and path == "/plan":
+            self.counts["requests"] += 1
+            try:
+                return 200, await self.plan(json.loads(body or b"{}"))
+            except OverflowError as error:
+                return 503, {"error": str(error)}
+            except (ValueError, KeyError, TypeError) as error:
+                self.counts["errors"] += 1
+                return 400, {"error": f"{type(error).__name__}: {error}"}
+        return 404, {"error": f"No route for {method} {path}"}
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode().split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, payload = await self._route(method, path, body)
+        except Exception as error:
+            self.counts["errors"] += 1
+            status, payload = 500, {"error": f"{type(error).__name__}: {error}"}
+
+        data = json.dumps(payload).encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + data
+        )
+        await writer.drain()
+        writer.close()
+
+
+class PlanningClient:
+    """Blocking client for a running PlanningService."""
+
+    def __init__(self, host=HOST, port=PORT, timeout=60.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        import http.client
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            body = json.dumps(payload).encode() if payload is not None else None
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            result = json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise RuntimeError(f"{response.status}: {result.get('error')}")
+        return result
+
+    def plan(self, **request):
+        return self._request("POST", "/plan", request)
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def health(self):
+        return self._request("GET", "/health")
+
+
+async def serve(matrix_csv=MATRIX_CSV, host=HOST, port=PORT, workers=None, max_queue=MAX_QUEUE):
+    service = PlanningService(matrix_csv, workers=workers, max_queue=max_queue)
+    server = await service.start(host, port)
+    print(f"Planning service on http://{host}:{port} with {service.workers} warm workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Always-warm local planning service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the service")
+    serve_parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    serve_parser.add_argument("--workers", type=int, default=None, help="solver processes (default: all cores)")
+    serve_parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="requests waiting beyond the workers")
+    plan_parser = commands.add_parser("plan", help="send one re-plan request to a running service")
+    plan_parser.add_argument("--demand", default="{}", help='JSON of changed demands, e.g. {"Woolworths Aotea": 4}')
+    plan_parser.add_argument("--remove", nargs="*", default=[], help="stores not delivered to")
+    plan_parser.add_argument("--time-limit", type=float, default=None)
+    commands.add_parser("stats", help="show a running service's stats")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.matrix, args.host, args.port, args.workers, args.max_queue))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "plan":
+        client = PlanningClient(args.host, args.port)
+        result = client.plan(demand=json.loads(args.demand), remove=args.remove, time_limit=args.time_limit)
+        print("Status:", result["status"])
+        print("Optimal cost:", result["objective"])
+        print("Woolworths vans retained:", result["vans"])
+        print("Timings:", ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in result["timings"].items()))
+        for route in result["routes"]:
+            print(" -", route["route"], "| Cost:", route["total_cost"], "| Van type:", route["van_type"])
+    else:
+        print(json.dumps(PlanningClient(args.host, args.port).stats(), indent=2))
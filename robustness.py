@@ -0,0 +1,153 @@
+"""
+Monte Carlo check of how a chosen schedule holds up when demand and
+traffic vary.
+
+Each sample draws a box count for every store (normal around the planned
+demand, rounded, never negative) and a mean-one lognormal factor for every
+leg of every route. Durations and costs for all samples are computed as
+array expressions, in chunks of samples to bound memory.
+
+    python robustness.py chosen_routes.csv --samples 100000
+"""
+import importlib
+
+import numpy as np
+import pandas as pd
+
+import van_schedule_solver
+from store_data import MATRIX_CSV, UNLOAD_MINUTES_PER_BOX
+from tour_set import TourSet
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+def evaluate_schedule(
+    routes,
+    durations,
+    demand,
+    van_types=None,
+    vans=None,
+    n_samples=10000,
+    demand_cv=0.2,
+    travel_sigma=0.15,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    sub60_route_cost=van_schedule_solver.SUB60_ROUTE_COST,
+    daily_van_cost=van_schedule_solver.DAILY_VAN_COST,
+    chunk_size=10000,
+    seed=None,
+):
+    """
+    Sample the duration and cost of every route in a schedule.
+
+    Args:
+        routes: route strings (or a TourSet) of the chosen schedule.
+        durations: DurationMatrix.
+        demand: planned boxes per store.
+        van_types: "WW" or "SUB60" per route (default all WW). SUB60 routes
+            cost the flat rate whatever their duration.
+        vans: WW vans retained (default: enough for two routes each).
+        n_samples (int): Number of demand/traffic samples.
+        demand_cv (float): Standard deviation of a store's boxes relative to its demand.
+        travel_sigma (float): Sigma of the lognormal factor on each leg.
+
+    Returns:
+        dict with "routes" (per-route table: planned and sampled duration,
+        overtime probability, cost), "plan" (summary of the daily cost) and
+        "plan_costs" (the daily cost of every sample).
+    """
+    tours = routes if isinstance(routes, TourSet) else TourSet.from_strings(routes)
+    n_routes = len(tours)
+    is_sub60 = np.array([van_type == "SUB60" for van_type in (van_types or ["WW"] * n_routes)])
+    if vans is None:
+        vans = int(np.ceil((~is_sub60).sum() / 2))
+    rng = np.random.default_rng(seed)
+
+    stops, lengths = tours.matrix_stops(durations)
+    legs = durations.array[stops[:, :-1], stops[:, 1:]]
+    legs = np.where(np.arange(1, stops.shape[1]) < lengths[:, None], legs, 0.0)
+    positions = np.arange(stops.shape[1])
+    intermediate = (positions > 0) & (positions < lengths[:, None] - 1)
+    planned_boxes = durations.vector(demand)
+    unload_per_box = unload_minutes_per_box * 60.0
+    mu = -0.5 * travel_sigma**2  # keeps the mean factor at one
+
+    route_minutes = np.empty((n_samples, n_routes))
+    route_costs = np.empty((n_samples, n_routes))
+    for first in range(0, n_samples, chunk_size):
+        size = min(chunk_size, n_samples - first)
+        # one box count per store per sample, shared by whichever route visits it
+        boxes = np.rint(planned_boxes * (1.0 + demand_cv * rng.standard_normal((size, len(planned_boxes)))))
+        boxes = np.maximum(boxes, 0.0)
+        route_boxes = np.where(intermediate, boxes[:, stops], 0.0).sum(axis=2)
+
+        factors = rng.lognormal(mu, travel_sigma, size=(size,) + legs.shape)
+        travel = (legs * factors).sum(axis=2)
+        total_seconds = travel + route_boxes * unload_per_box
+
+        costs = route_cost.compute_costs(total_seconds)[4]
+        route_minutes[first : first + size] = total_seconds / 60.0
+        route_costs[first : first + size] = np.where(is_sub60, sub60_route_cost, costs)
+
+    plan_costs = route_costs.sum(axis=1) + vans * daily_van_cost
+    planned_seconds = legs.sum(axis=1) + np.where(intermediate, planned_boxes[stops], 0.0).sum(axis=1) * unload_per_box
+    over_shift = route_minutes > route_cost.SHIFT_MINUTES
+
+    table = pd.DataFrame(
+        {
+            "route": tours.to_strings(),
+            "van_type": np.where(is_sub60, "SUB60", "WW"),
+            "planned_minutes": planned_seconds / 60.0,
+            "mean_minutes": route_minutes.mean(axis=0),
+            "p95_minutes": np.percentile(route_minutes, 95, axis=0),
+            "overtime_probability": over_shift.mean(axis=0),
+            "mean_cost": route_costs.mean(axis=0),
+            "p95_cost": np.percentile(route_costs, 95, axis=0),
+        }
+    )
+    plan = {
+        "samples": n_samples,
+        "vans": vans,
+        "mean_cost": plan_costs.mean(),
+        "std_cost": plan_costs.std(),
+        "p5_cost": np.percentile(plan_costs, 5),
+        "p50_cost": np.percentile(plan_costs, 50),
+        "p95_cost": np.percentile(plan_costs, 95),
+        "any_overtime_probability": over_shift[:, ~is_sub60].any(axis=1).mean(),
+    }
+    return {"routes": table, "plan": plan, "plan_costs": plan_costs}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from duration_matrix import DurationMatrix
+    from store_data import DEMAND_WEEKDAYS
+
+    parser = argparse.ArgumentParser(description="Monte Carlo robustness of a chosen schedule")
+    parser.add_argument("chosen", help="CSV of the chosen routes (route column, optional van_type column)")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--demand-cv", type=float, default=0.2)
+    parser.add_argument("--travel-sigma", type=float, default=0.15)
+    parser.add_argument("--vans", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    chosen = pd.read_csv(args.chosen)
+    start = time.perf_counter()
+    result = evaluate_schedule(
+        list(chosen["route"]),
+        DurationMatrix.from_csv(args.matrix),
+        DEMAND_WEEKDAYS,
+        van_types=list(chosen["van_type"]) if "van_type" in chosen else None,
+        vans=args.vans,
+        n_samples=args.samples,
+        demand_cv=args.demand_cv,
+        travel_sigma=args.travel_sigma,
+        seed=args.seed,
+    )
+    print(result["routes"].to_string(index=False))
+    for key, value in result["plan"].items():
+        print(f"{key}: {value}")
+    print(f"Evaluated in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,164 @@
+"""
+Content-addressed cache of costed route pools.
+
+A pool is cached in three layers, each keyed by a hash of exactly what it
+depends on:
+
+    tours    stores, demand, depot, capacity, max_intermediate, best_order
+             (and the matrix when best_order picks orderings by travel time)
+    seconds  tours key + duration matrix + demand + unload rate
+    money    seconds key + SHIFT_MINUTES, BASE_RATE_PER_HR, OT_RATE_PER_HR
+
+so changing the hourly rates only recomputes the cost columns from cached
+durations, and an unchanged rerun loads everything from disk. Entries are
+.npz files; the directory is kept under a size cap by evicting the least
+recently used entries.
+"""
+import hashlib
+import importlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+import duration_engine
+import instrumentation
+import route_gen
+from tour_set import TourSet
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+CACHE_DIR = ".route_cache"
+MAX_BYTES = 256 * 1024 * 1024
+
+
+def hash_key(*parts):
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+class RouteCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = []
+        self.misses = []
+
+    def _path(self, layer, key):
+        return self.cache_dir / f"{layer}-{key}.npz"
+
+    def get(self, layer, key):
+        path = self._path(layer, key)
+        if not path.exists():
+            self.misses.append(layer)
+            instrumentation.count("cache_misses")
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        # mark as recently used for eviction
+        os.utime(path)
+        self.hits.append(layer)
+        instrumentation.count("cache_hits")
+        return arrays
+
+    def put(self, layer, key, arrays):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(layer, key)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the directory is under
+        max_bytes, never the entry at keep (the one just written).
+        """
+        entries = [(path.stat().st_mtime, path.stat().st_size, path) for path in self.cache_dir.glob("*.npz")]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.npz"):
+            path.unlink()
+
+
+def cached_cost_columns(
+    cache,
+    durations,
+    nodes,
+    demand,
+    start,
+    max_demand,
+    max_intermediate=4,
+    best_order=False,
+    unload_minutes_per_box=15,
+    shift_minutes=route_cost.SHIFT_MINUTES,
+    base_rate_per_hr=route_cost.BASE_RATE_PER_HR,
+    ot_rate_per_hr=route_cost.OT_RATE_PER_HR,
+):
+    """
+    The columns RouteCost&Duration.cost_columns produces, going through the
+    three cache layers. Only the layers whose inputs changed are recomputed.
+    """
+    stores = sorted(node for node in nodes if node != start)
+    matrix_key = durations.fingerprint()
+
+    # Layer 1: the tours themselves
+    tours_key = hash_key(
+        "tours", stores, demand, start, max_demand, max_intermediate, best_order,
+        matrix_key if best_order else None,
+    )
+    with instrumentation.stage("generate_tours") as stage:
+        arrays = cache.get("tours", tours_key)
+        if arrays is None:
+            if best_order:
+                found = route_gen.best_tours(nodes, demand, start, max_demand, durations.seconds, max_intermediate)
+            else:
+                found = route_gen.enumerate_tours(nodes, demand, start, max_demand, max_intermediate)
+            tours = TourSet.from_paths((path for path, _, _ in found), names=stores, depot=start)
+            arrays = {"names": np.array(stores, dtype=str), "stops": tours.stops, "lengths": tours.lengths}
+            cache.put("tours", tours_key, arrays)
+        tours = TourSet(arrays["names"].tolist(), arrays["stops"], arrays["lengths"], depot=start)
+        stage.count("tours_kept", len(tours))
+
+    with instrumentation.stage("cost_routes", tours=len(tours)) as stage:
+        # Layer 2: travel and unloading seconds, tours with a missing leg dropped
+        seconds_key = hash_key("seconds", tours_key, matrix_key, demand, unload_minutes_per_box)
+        seconds = cache.get("seconds", seconds_key)
+        if seconds is None:
+            stops, lengths = tours.matrix_stops(durations)
+            travel = duration_engine.travel_seconds(durations.array, stops, lengths)
+            unloading = duration_engine.unloading_seconds(
+                durations.vector(demand), stops, lengths, unload_minutes_per_box
+            )
+            keep = ~np.isnan(travel)
+            seconds = {"keep": keep, "travel_seconds": travel[keep], "unloading_seconds": unloading[keep]}
+            cache.put("seconds", seconds_key, seconds)
+        stage.count("routes_costed", int(seconds["keep"].sum()))
+        stage.count("routes_dropped", int((~seconds["keep"]).sum()))
+        tours = tours.subset(seconds["keep"])
+        total_sec = seconds["travel_seconds"] + seconds["unloading_seconds"]
+
+        # Layer 3: money
+        money_key = hash_key("money", seconds_key, shift_minutes, base_rate_per_hr, ot_rate_per_hr)
+        money = cache.get("money", money_key)
+        if money is None:
+            costs = route_cost.compute_costs(total_sec, shift_minutes, base_rate_per_hr, ot_rate_per_hr)
+            money = dict(zip(route_cost.COST_COLUMNS, costs))
+            cache.put("money", money_key, money)
+
+    return route_cost.costed_columns(
+        tours.to_strings(),
+        seconds["travel_seconds"],
+        seconds["unloading_seconds"],
+        [money[name] for name in route_cost.COST_COLUMNS],
+    )
@@ -1,13 +1,255 @@
-import itertools
-import pandas as pd
 import numpy as np
-from pandas import read_csv
+import duration_engine
+import instrumentation
+from duration_matrix import DurationMatrix
 
 
-def generate_tours(nodes, demand, start, max_demand_per_route, filename):
+def nearest_candidates(nodes, start, leg_seconds, k, depot_band=None):
+    """
+    The stores each store may be followed by on a route: its k nearest
+    other stores by travel time.
+
+    Args:
+        nodes (iterable): Distinct nodes (the start node is skipped if present).
+        start: The depot.
+        leg_seconds: Function (a, b) -> seconds, or None if there is no such leg.
+        k (int): Candidates kept per store.
+        depot_band: Optional seconds; a store only follows another if their
+            travel times from the depot differ by at most this much.
+
+    Returns:
+        dict mapping each store to its candidate successors, nearest first.
+    """
+    others = [n for n in nodes if n != start]
+    from_depot = {n: leg_seconds(start, n) for n in others}
+    candidates = {}
+    for a in others:
+        options = []
+        for b in others:
+            if b == a:
+                continue
+            leg = leg_seconds(a, b)
+            if leg is None:
+                continue
+            if depot_band is not None and (
+                from_depot[a] is None or from_depot[b] is None or abs(from_depot[a] - from_depot[b]) > depot_band
+            ):
+                continue
+            options.append((leg, b))
+        options.sort(key=lambda option: option[0])
+        candidates[a] = [b for _, b in options[:k]]
+    return candidates
+
+
+def enumerate_tours(
+    nodes,
+    demand,
+    start,
+    max_demand_per_route,
+    max_intermediate=4,
+    leg_seconds=None,
+    candidates=None,
+    first_stops=None,
+    stats=None,
+):
+    """
+    Lazily yield every tour starting and ending at 'start' that fits within
+    the demand limit, extending paths depth first.
+
+    A partial path is abandoned as soon as its cumulative demand goes over
+    max_demand_per_route, so infeasible extensions are never built. When
+    leg_seconds is given the travel time is carried along the shared prefix
+    instead of being re-summed for every tour.
+
+    Args:
+        nodes (iterable): Distinct nodes (the start node is skipped if present).
+        demand: dictionary mapping the expected demand to the relevant store.
+        start: The starting node.
+        max_demand_per_route (int): The maximum demand per route.
+        max_intermediate (int): The maximum number of stores on a tour.
+        leg_seconds: Optional function (a, b) -> seconds, or None if there is no such leg.
+        candidates: Optional dict store -> stores allowed to follow it (see
+            nearest_candidates); the first store after the start is unrestricted.
+        first_stops: Optional stores allowed as the first stop (e.g. one
+            partition of the tours for a worker process).
+        stats: Optional dict; extensions_pruned (over capacity) and
+            candidates_skipped (not a candidate) are added to it once the
+            tours are exhausted.
+
+    Yields:
+        (path, total_demand, travel_seconds) where path is a list of nodes
+        including the start at both ends and travel_seconds is None unless
+        leg_seconds was given.
+    """
+    others = [n for n in nodes if n != start]
+    path = [start]
+    on_path = set()
+    # extensions rejected on capacity or as non-candidates, reported to the open instrumentation stage
+    pruned = [0]
+    skipped = [0]
+
+    def extend(load, travel):
+        following = others
+        if first_stops is not None and len(path) == 1:
+            following = [n for n in others if n in first_stops]
+        elif candidates is not None and len(path) > 1:
+            following = candidates[path[-1]]
+            skipped[0] += len(others) - 1 - len(following)
+        for node in following:
+            if node in on_path:
+                continue
+            total = load + demand[node]
+            # demand only grows along a path, so nothing past here can fit
+            if total > max_demand_per_route:
+                pruned[0] += 1
+                continue
+            node_travel = None
+            if leg_seconds is not None:
+                leg = leg_seconds(path[-1], node)
+                if leg is None:
+                    continue
+                node_travel = travel + leg
+            path.append(node)
+            on_path.add(node)
+
+            if leg_seconds is None:
+                yield path + [start], total, None
+            else:
+                back = leg_seconds(node, start)
+                if back is not None:
+                    yield path + [start], total, node_travel + back
+
+            if len(path) - 1 < max_intermediate:
+                yield from extend(total, node_travel)
+            path.pop()
+            on_path.discard(node)
+
+    yield from extend(demand.get(start, 0), 0.0 if leg_seconds is not None else None)
+    instrumentation.count("extensions_pruned", pruned[0])
+    instrumentation.count("candidates_skipped", skipped[0])
+    if stats is not None:
+        stats["extensions_pruned"] = stats.get("extensions_pruned", 0) + pruned[0]
+        stats["candidates_skipped"] = stats.get("candidates_skipped", 0) + skipped[0]
+
+
+def best_tours(
+    nodes, demand, start, max_demand_per_route, leg_seconds, max_intermediate=4, candidates=None, stats=None
+):
+    """
+    Yield one tour per capacity-feasible set of stores, visiting the stores in
+    the order with the least travel time.
+
+    Uses subset dynamic programming (Held-Karp): the cheapest way to reach
+    each (set of visited stores, last store) pair is built from the layer
+    with one store fewer, so orderings are never enumerated one by one.
+    Unloading time only depends on the set of stores, so the shortest
+    ordering is also the cheapest under the shift/overtime cost.
+
+    Args:
+        nodes (iterable): Distinct nodes (the start node is skipped if present).
+        demand: dictionary mapping the expected demand to the relevant store.
+        start: The starting node.
+        max_demand_per_route (int): The maximum demand per route.
+        leg_seconds: Function (a, b) -> seconds, or None if there is no such leg.
+        max_intermediate (int): The maximum number of stores on a tour.
+        candidates: Optional dict store -> stores allowed to follow it (see
+            nearest_candidates).
+        stats: Optional dict; dp_states and candidates_skipped are added to
+            it once the tours are exhausted.
+
+    Yields:
+        (path, total_demand, travel_seconds) for each feasible store set.
+    """
+    others = [n for n in nodes if n != start]
+    start_demand = demand.get(start, 0)
+    # positions in others each store may be followed by
+    position = {node: i for i, node in enumerate(others)}
+    if candidates is None:
+        following = [range(len(others))] * len(others)
+    else:
+        following = [[position[b] for b in candidates[a] if b in position] for a in others]
+
+    # layer[(mask, last)] = (travel seconds from start, previous last store)
+    layer = {}
+    load = {}
+    for i, node in enumerate(others):
+        total = start_demand + demand[node]
+        leg = leg_seconds(start, node)
+        if total > max_demand_per_route or leg is None:
+            continue
+        layer[(1 << i, i)] = (leg, -1)
+        load[1 << i] = total
+
+    layers = []
+    states = 0
+    skipped = 0
+    while layer:
+        states += len(layer)
+        layers.append(layer)
+        if len(layers) == max_intermediate:
+            break
+        next_layer = {}
+        for (mask, last), (travel, _) in layer.items():
+            if candidates is not None:
+                skipped += len(others) - 1 - len(following[last])
+            for j in following[last]:
+                node = others[j]
+                if mask & (1 << j):
+                    continue
+                total = load[mask] + demand[node]
+                if total > max_demand_per_route:
+                    continue
+                leg = leg_seconds(others[last], node)
+                if leg is None:
+                    continue
+                key = (mask | (1 << j), j)
+                if key not in next_layer or travel + leg < next_layer[key][0]:
+                    next_layer[key] = (travel + leg, last)
+                    load[key[0]] = total
+        layer = next_layer
+
+    for layer in layers:
+        # close each set back to the start through its best last store
+        best = {}
+        for (mask, last), (travel, _) in layer.items():
+            back = leg_seconds(others[last], start)
+            if back is None:
+                continue
+            if mask not in best or travel + back < best[mask][0]:
+                best[mask] = (travel + back, last)
+
+        for mask, (travel, last) in best.items():
+            # walk the predecessors back to the start
+            order = []
+            while last != -1:
+                order.append(others[last])
+                prev = layers[bin(mask).count("1") - 1][(mask, last)][1]
+                mask &= ~(1 << last)
+                last = prev
+            path = [start] + order[::-1] + [start]
+            yield path, sum(demand[n] for n in path), travel
+    instrumentation.count("dp_states", states)
+    if candidates is not None:
+        instrumentation.count("candidates_skipped", skipped)
+    if stats is not None:
+        stats["dp_states"] = stats.get("dp_states", 0) + states
+        stats["candidates_skipped"] = stats.get("candidates_skipped", 0) + skipped
+
+
+def generate_tours(
+    nodes,
+    demand,
+    start,
+    max_demand_per_route,
+    filename,
+    max_intermediate=4,
+    leg_seconds=None,
+    neighbors=None,
+    depot_band=None,
+):
     """
     Generate all tours starting and ending at 'start',
-    visiting up to 4 distinct intermediate nodes.
+    visiting up to max_intermediate distinct intermediate nodes.
 
     Args:
         nodes (set): Set of distinct nodes (including start).
@@ -15,56 +257,57 @@ def generate_tours(nodes, demand, start, max_demand_per_route, filename):
         start: The starting node.
         max_demand_per_route (int): The maximum demand per route.
         filename (str): File to save tours into.
+        max_intermediate (int): The maximum number of stores on a tour.
+        leg_seconds: Function (a, b) -> seconds, or None if there is no such
+            leg; needed for neighbors.
+        neighbors (int): Only let each store be followed by its k nearest
+            stores (see nearest_candidates).
+        depot_band: With neighbors, also only by stores whose travel time
+            from the start differs by at most this many seconds.
     """
     # Ensure start is in the nodes set
     if start not in nodes:
         raise ValueError("Starting node must be in the set of nodes.")
 
+    candidates = None
+    if neighbors is not None:
+        if leg_seconds is None:
+            raise ValueError("neighbors needs leg_seconds.")
+        candidates = nearest_candidates(nodes, start, leg_seconds, neighbors, depot_band)
+
     tours = []
-    other_nodes = nodes - {start}
     demand_total = []
+    stats = {}
 
-    # Generate tours with 1 to 4 intermediate nodes
-    for r in range(1, 5):
-        # generates all possible ordered arrangements (of length r, using nodes that are not the start node)
-        for perm in itertools.permutations(other_nodes, r):
-            # record all the possible paths of this length
-            path = [start] + list(perm) + [start]
-            # check that the path is valid with demand
-            total = 0
-            for store in path:
-                total += demand[store]
-            if total <= max_demand_per_route:
-                tours.append("->".join(path))
-                demand_total.append(total)
+    # Only capacity-feasible paths are ever built
+    with instrumentation.stage("generate_tours") as stage:
+        for path, total, _ in enumerate_tours(
+            nodes, demand, start, max_demand_per_route, max_intermediate, candidates=candidates, stats=stats
+        ):
+            tours.append("->".join(path))
+            demand_total.append(total)
+        stage.count("tours_kept", len(tours))
+    print(
+        f"Pruned {stats['extensions_pruned']} extensions over capacity"
+        + (f", skipped {stats['candidates_skipped']} non-candidate stores" if candidates is not None else "")
+    )
 
     # Write tours to file
-    with open(filename, "w") as f:
-        for tour in tours:
-            f.write(tour + "\n")
+    with instrumentation.stage("write_tours", tours=len(tours)):
+        with open(filename, "w") as f:
+            for tour in tours:
+                f.write(tour + "\n")
 
     print(f"Saved {len(tours)} tours to {filename}")
     return tours, demand_total
 
 def find_duration(tours, duration_data, index, demand_total):
-    duration = np.zeros(len(tours))
-    tour_number = 0
-    for tour in tours:
-        nodes = tour.split('->')
-        route_demand = demand_total[tour_number]
-        prev = "CentrePort Wellington"
-        for node in nodes:
-            prev_index = index[prev]
-            node_index = index[node]
-            duration[tour_number] += duration_data.iloc[prev_index, node_index+1]
-            prev = node
-        duration[tour_number] += 15 * 60 * route_demand
-        tour_number += 1
-    return duration
+    # All legs of all tours in one vectorized pass, see duration_engine
+    return duration_engine.find_duration(tours, duration_data, index, demand_total)
 
 if __name__ == '__main__':
-    duration_dataset = pd.read_csv("WoolworthsDurations2025.csv")
-    print(duration_dataset.index)
+    durations = DurationMatrix.from_csv("WoolworthsDurations2025.csv")
+    print(durations.names)
     nodes = {"FreshChoice Cannons Creek",
              "FreshChoice Cuba Street",
             "FreshChoice Woburn",
@@ -0,0 +1,188 @@
+"""
+Costed route pool that can be updated one store at a time.
+
+When a single store's demand changes, or a store is added or removed, only
+the routes through that store are dropped, regenerated and recosted; the
+rest of the pool is left as it is. Each update returns the routes it
+removed and the routes it added, so a solver model can be patched instead
+of rebuilt.
+"""
+import importlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import duration_engine
+import route_gen
+from store_data import DEPOT, MAX_INTERMEDIATE, UNLOAD_MINUTES_PER_BOX
+from tour_set import SEPARATOR, TourSet
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+# removed: route strings taken out of the pool; added: DataFrame of the new costed routes
+PoolChange = namedtuple("PoolChange", ["removed", "added"])
+
+COLUMNS = ["route", "demand", "travel_seconds", "unloading_seconds", "total_time_seconds", "total_cost"]
+
+
+class RoutePool:
+    """
+    Every capacity-feasible route over the stores in demand (or, with
+    best_order, the fastest ordering of every feasible store set), with
+    its costs. Build it with RoutePool.build.
+    """
+
+    def __init__(
+        self,
+        durations,
+        demand,
+        max_demand,
+        depot=DEPOT,
+        max_intermediate=MAX_INTERMEDIATE,
+        best_order=False,
+        unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+        cost_params=None,
+    ):
+        self.durations = durations
+        self.demand = dict(demand)
+        self.demand.setdefault(depot, 0)
+        self.max_demand = max_demand
+        self.depot = depot
+        self.max_intermediate = max_intermediate
+        self.best_order = best_order
+        self.unload_minutes_per_box = unload_minutes_per_box
+        self.cost_params = dict(cost_params or {})
+        # route key -> row of COLUMNS; store -> keys of the routes through it
+        self.routes = {}
+        self.by_store = {store: set() for store in self.stores()}
+
+    @classmethod
+    def build(cls, durations, demand, max_demand, **options):
+        pool = cls(durations, demand, max_demand, **options)
+        leg_seconds = durations.seconds
+        nodes = list(pool.demand)
+        if pool.best_order:
+            found = route_gen.best_tours(nodes, pool.demand, pool.depot, max_demand, leg_seconds, pool.max_intermediate)
+        else:
+            found = route_gen.enumerate_tours(nodes, pool.demand, pool.depot, max_demand, pool.max_intermediate)
+        pool._insert([path[1:-1] for path, _, _ in found])
+        return pool
+
+    def __len__(self):
+        return len(self.routes)
+
+    def stores(self):
+        return [store for store in self.demand if store != self.depot]
+
+    def to_frame(self):
+        return pd.DataFrame(list(self.routes.values()), columns=COLUMNS)
+
+    def tours(self):
+        return TourSet.from_frame(self.to_frame(), names=self.stores(), depot=self.depot)
+
+    def set_demand(self, store, boxes):
+        """Change one store's demand; only routes through it are rechecked and recosted."""
+        if store not in self.by_store:
+            raise KeyError(f"{store} is not in the route pool.")
+        removed = self._drop(store)
+        self.demand[store] = boxes
+        return PoolChange(removed, self._insert(self._paths_through(store)))
+
+    def add_store(self, store, boxes):
+        """Add a store (it must be in the duration matrix) and the routes through it."""
+        if store in self.by_store:
+            raise ValueError(f"{store} is already in the route pool.")
+        self.durations.index_of(store)
+        self.demand[store] = boxes
+        self.by_store[store] = set()
+        return PoolChange([], self._insert(self._paths_through(store)))
+
+    def remove_store(self, store):
+        """Remove a store and every route through it."""
+        if store not in self.by_store:
+            raise KeyError(f"{store} is not in the route pool.")
+        removed = self._drop(store)
+        del self.by_store[store]
+        del self.demand[store]
+        return PoolChange(removed, pd.DataFrame(columns=COLUMNS))
+
+    def _key(self, path):
+        return frozenset(path) if self.best_order else tuple(path)
+
+    def _drop(self, store):
+        removed = []
+        for key in self.by_store[store]:
+            row = self.routes.pop(key)
+            removed.append(row["route"])
+            for other in key:
+                if other != store:
+                    self.by_store[other].discard(key)
+        self.by_store[store] = set()
+        return removed
+
+    def _paths_through(self, store):
+        """Every feasible path (stores only) that visits store."""
+        # capacity left for the rest of the route
+        limit = self.max_demand - self.demand[store]
+        if limit < self.demand[self.depot]:
+            return []
+        # the rest of the route: feasible paths over the other stores with what capacity is left
+        nodes = [node for node in self.demand if node != store]
+        rests = [[]]
+        if self.max_intermediate > 1:
+            if self.best_order:
+                found = route_gen.best_tours(
+                    nodes, self.demand, self.depot, limit,
+                    self.durations.seconds, self.max_intermediate - 1,
+                )
+            else:
+                found = route_gen.enumerate_tours(
+                    nodes, self.demand, self.depot, limit, self.max_intermediate - 1
+                )
+            rests += [path[1:-1] for path, _, _ in found]
+
+        if not self.best_order:
+            return [rest[:i] + [store] + rest[i:] for rest in rests for i in range(len(rest) + 1)]
+
+        # fastest ordering of each store set with the store added
+        paths = []
+        for rest in rests:
+            for path, _, _ in route_gen.best_tours(
+                rest + [store, self.depot], self.demand, self.depot, self.max_demand,
+                self.durations.seconds, len(rest) + 1,
+            ):
+                if len(path) == len(rest) + 3:
+                    paths.append(path[1:-1])
+        return paths
+
+    def _insert(self, paths):
+        """Cost paths in one vectorized pass and add them to the pool; returns the added rows."""
+        if not paths:
+            return pd.DataFrame(columns=COLUMNS)
+        tours = TourSet.from_paths(paths, names=self.stores(), demand=self.demand, depot=self.depot)
+        stops, lengths = tours.matrix_stops(self.durations)
+        travel = duration_engine.travel_seconds(self.durations.array, stops, lengths)
+        unloading = duration_engine.unloading_seconds(
+            self.durations.vector(self.demand), stops, lengths, self.unload_minutes_per_box
+        )
+        total = travel + unloading
+        cost = route_cost.compute_costs(total, **self.cost_params)[4]
+        keep = ~np.isnan(travel)
+
+        added = pd.DataFrame(
+            {
+                "route": [SEPARATOR.join([self.depot] + path + [self.depot]) for path in paths],
+                "demand": tours.columns["demand"],
+                "travel_seconds": travel,
+                "unloading_seconds": unloading,
+                "total_time_seconds": total,
+                "total_cost": cost,
+            }
+        )[keep].reset_index(drop=True)
+        for path, row in zip((path for path, kept in zip(paths, keep) if kept), added.to_dict("records")):
+            key = self._key(path)
+            self.routes[key] = row
+            for store in path:
+                self.by_store[store].add(key)
+        return added
@@ -0,0 +1,219 @@
+"""
+Streaming route generation, costing and writing in fixed-size chunks.
+
+Tours come lazily out of route_gen.enumerate_tours (capacity filtering
+happens inside the depth-first search), are grouped into chunks of
+chunk_size, costed a chunk at a time with the vectorized engine and
+appended to the output files, so peak memory depends on the chunk size
+and not on how many routes there are. Each chunk reports its size,
+timing and throughput.
+
+    python route_stream.py --max-intermediate 6 --chunk-size 100000
+"""
+import importlib
+import itertools
+import time
+from pathlib import Path
+
+import numpy as np
+
+import duration_engine
+import instrumentation
+import route_gen
+from store_data import DEPOT, UNLOAD_MINUTES_PER_BOX
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+CHUNK_SIZE = 50000
+
+# Columns of the full table, as RouteCost&Duration.costed_columns builds them
+FULL_COLUMNS = [
+    "route",
+    "travel_seconds",
+    "unloading_seconds",
+    "total_time_seconds",
+    "total_time_minutes",
+    *route_cost.COST_COLUMNS,
+]
+
+
+def chunked(iterable, size):
+    """Lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def cost_chunk(paths, durations, boxes, unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX):
+    """RouteCost&Duration.cost_columns for one chunk of paths; tours with a missing leg are dropped."""
+    stops, lengths = duration_engine.encode_tours(paths, durations.index)
+    travel_sec = duration_engine.travel_seconds(durations.array, stops, lengths)
+    unloading_sec = duration_engine.unloading_seconds(boxes, stops, lengths, unload_minutes_per_box)
+    keep = ~np.isnan(travel_sec)
+    travel_sec = travel_sec[keep]
+    unloading_sec = unloading_sec[keep]
+    return route_cost.costed_columns(
+        ["->".join(path) for path, kept in zip(paths, keep) if kept],
+        travel_sec,
+        unloading_sec,
+        route_cost.compute_costs(travel_sec + unloading_sec),
+    )
+
+
+class ChunkWriter:
+    """
+    Appends column chunks to a CSV and, optionally, a Parquet file (needs
+    pyarrow). The outputs are replaced as soon as the writer is made, so a
+    run that produces no rows never leaves an earlier run's files behind.
+    """
+
+    def __init__(self, out_csv, columns=None, formats=("csv",)):
+        unknown = set(formats) - {"csv", "parquet"}
+        if unknown:
+            raise ValueError(f"Cannot stream output format: {sorted(unknown)}")
+        self.out_csv = Path(out_csv)
+        self.columns = columns
+        self.formats = formats
+        self.rows = 0
+        self._parquet = None
+        if "csv" in formats:
+            # header only until the first chunk arrives
+            self.out_csv.write_text(",".join(columns) + "\n" if columns is not None else "")
+        if "parquet" in formats:
+            self.out_csv.with_suffix(".parquet").unlink(missing_ok=True)
+
+    def write(self, chunk):
+        import pandas as pd
+
+        frame = pd.DataFrame(chunk)
+        if self.columns is not None:
+            frame = frame[self.columns]
+        if "csv" in self.formats:
+            frame.to_csv(self.out_csv, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        if "parquet" in self.formats:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.out_csv.with_suffix(".parquet"), table.schema)
+            self._parquet.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def stream_costed_routes(
+    durations,
+    nodes,
+    demand,
+    max_demand,
+    full_out_csv,
+    slim_out_csv,
+    start=DEPOT,
+    max_intermediate=4,
+    chunk_size=CHUNK_SIZE,
+    unload_minutes_per_box=UNLOAD_MINUTES_PER_BOX,
+    formats=("csv",),
+    tours_txt=None,
+    on_chunk=None,
+):
+    """
+    Generate, cost and write every capacity-feasible tour chunk by chunk.
+
+    Writes the same two tables as RouteCost&Duration.save_csvs_with_costs
+    (and the plain tour list to tours_txt if given). on_chunk is called
+    with each chunk's report: chunk number, tours, routes written,
+    seconds, tours per second and peak RSS in MB (None where the platform
+    does not report it).
+
+    Returns totals: chunks, tours, routes, seconds, peak_rss_mb.
+    """
+    boxes = durations.vector(demand)
+    tours = (path for path, _, _ in route_gen.enumerate_tours(nodes, demand, start, max_demand, max_intermediate))
+    full = ChunkWriter(full_out_csv, columns=FULL_COLUMNS, formats=formats)
+    slim = ChunkWriter(slim_out_csv, columns=["route", "total_cost"], formats=formats)
+    tours_file = open(tours_txt, "w") if tours_txt is not None else None
+
+    began = time.perf_counter()
+    totals = {"chunks": 0, "tours": 0, "routes": 0}
+    try:
+        clock = time.perf_counter()
+        for number, paths in enumerate(chunked(tours, chunk_size)):
+            columns = cost_chunk(paths, durations, boxes, unload_minutes_per_box)
+            full.write(columns)
+            slim.write(columns)
+            if tours_file is not None:
+                tours_file.writelines(route + "\n" for route in columns["route"])
+
+            now = time.perf_counter()
+            report = {
+                "chunk": number,
+                "tours": len(paths),
+                "routes": len(columns["route"]),
+                "seconds": now - clock,
+                "tours_per_second": len(paths) / max(now - clock, 1e-9),
+                "peak_rss_mb": instrumentation.peak_rss_mb(),
+            }
+            clock = now
+            totals["chunks"] += 1
+            totals["tours"] += len(paths)
+            totals["routes"] += len(columns["route"])
+            if on_chunk is not None:
+                on_chunk(report)
+    finally:
+        full.close()
+        slim.close()
+        if tours_file is not None:
+            tours_file.close()
+
+    totals["seconds"] = time.perf_counter() - began
+    totals["peak_rss_mb"] = instrumentation.peak_rss_mb()
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from duration_matrix import DurationMatrix
+    from store_data import DEMAND_WEEKDAYS, MATRIX_CSV, MAX_DEMAND_STANDARD
+
+    parser = argparse.ArgumentParser(description="Stream every feasible route to the cost tables in chunks")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--max-demand", type=int, default=MAX_DEMAND_STANDARD, help="van capacity in boxes")
+    parser.add_argument("--max-intermediate", type=int, default=4, help="stores per route")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="tours per chunk")
+    parser.add_argument("--formats", nargs="+", default=["csv"], choices=["csv", "parquet"])
+    parser.add_argument("--full-out", default="Routes with Duration & per box - Standard.csv")
+    parser.add_argument("--slim-out", default="Route and Total Cost - Standard.csv")
+    parser.add_argument("--tours-txt", default=None, help="also write the plain tour list here")
+    args = parser.parse_args()
+
+    def rss(mb):
+        return "n/a" if mb is None else f"{mb:.0f} MB"
+
+    totals = stream_costed_routes(
+        DurationMatrix.from_csv(args.matrix),
+        set(DEMAND_WEEKDAYS),
+        DEMAND_WEEKDAYS,
+        args.max_demand,
+        args.full_out,
+        args.slim_out,
+        max_intermediate=args.max_intermediate,
+        chunk_size=args.chunk_size,
+        formats=tuple(args.formats),
+        tours_txt=args.tours_txt,
+        on_chunk=lambda r: print(
+            f"chunk {r['chunk']:>4}: {r['tours']:>8} tours, {r['routes']:>8} written in {r['seconds']:.2f} s "
+            f"({r['tours_per_second']:,.0f} tours/s), peak RSS {rss(r['peak_rss_mb'])}"
+        ),
+    )
+    print(
+        f"{totals['routes']} routes in {totals['chunks']} chunks, {totals['seconds']:.1f} s, "
+        f"peak RSS {rss(totals['peak_rss_mb'])}"
+    )
@@ -1,25 +1,143 @@
 # Testing Constraints
+#
+#     python route_validation_tests.py [standard.csv extra.csv]
+#
+# Checks every route in the Standard/Extra tables (by default the committed
+# "Routes with Duration & Cost break up" tables): depot start/end, capacity,
+# and that every duration implementation (duration_engine, find_duration,
+# compute_travel_seconds + compute_unloading_seconds) and the table's own
+# columns agree on each route's duration and cost.
+import importlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import duration_engine
+from duration_calculator import find_duration
+from duration_matrix import DurationMatrix
+
+route_cost = importlib.import_module("RouteCost&Duration")
+compute_travel_seconds = route_cost.compute_travel_seconds
+compute_travel_seconds_batch = route_cost.compute_travel_seconds_batch
+compute_unloading_seconds = route_cost.compute_unloading_seconds
+compute_costs = route_cost.compute_costs
+
+
 def close_enough(a, b, tol=1e-6):
     # Return True if a and b are within tolerance
     return abs(a - b) <= tol
 
 
-def check_depot_starts_and_ends(routes, depot, sample_size=10):
-    # Check that each sampled route starts and ends at the depot
+def check_depot_starts_and_ends(routes, depot, sample_size=None):
+    # Check that each route (or the first sample_size) starts and ends at the depot
     for route in routes[:sample_size]:
         starts_at_depot = (route[0] == depot)
         ends_at_depot = (route[-1] == depot)
         assert starts_at_depot and ends_at_depot, "Route does not start/end at " + depot + ": " + str(route)
 
 
-def check_capacity(routes, demand_by_store, max_boxes, sample_size=10):
-    # Check that total boxes on each sampled route stay within capacity
+def check_capacity(routes, demand_by_store, max_boxes, sample_size=None):
+    # Check that total boxes on each route (or the first sample_size) stay within capacity
     for route in routes[:sample_size]:
         total_boxes = sum(demand_by_store.get(stop, 0) for stop in route)
         assert total_boxes <= max_boxes, "Route exceeds capacity (" + str(total_boxes) + " > " + str(
             max_boxes) + "): " + str(route)
 
 
+def mismatches(routes, check, expected, got, tol):
+    # Rows where two per-route arrays differ by more than tol (or only one is NaN)
+    got = np.asarray(got, dtype=np.float64)
+    expected = np.broadcast_to(np.asarray(expected, dtype=np.float64), got.shape)
+    both_nan = np.isnan(expected) & np.isnan(got)
+    bad = ~both_nan & ~(np.abs(expected - got) <= tol)
+    return pd.DataFrame(
+        {
+            "route": np.asarray(routes, dtype=object)[bad],
+            "check": check,
+            "expected": expected[bad],
+            "got": got[bad],
+        }
+    )
+
+
+def validate_routes(table, durations, lookup, demand_by_store, max_boxes, depot="Centre Port",
+                    unload_minutes_per_box=15, tol=1e-6):
+    """
+    Check every route of a routes table (route column, plus any of the
+    duration/cost columns RouteCost&Duration writes).
+
+    Each implementation recomputes all routes in one pass:
+        engine         duration_engine on the DurationMatrix
+        lookup         compute_travel_seconds_batch + compute_unloading_seconds
+        find_duration  duration_calculator.find_duration on the route strings
+    and the table's own columns are compared against the engine.
+
+    Returns a DataFrame of failures (route, check, expected, got); empty if all pass.
+    """
+    routes = table["route"].tolist()
+    paths = [route.split("->") for route in routes]
+    failures = []
+
+    # Depot at both ends and nowhere else
+    starts = np.array([path[0] == depot for path in paths])
+    ends = np.array([path[-1] == depot for path in paths])
+    inside = np.array([depot in path[1:-1] for path in paths])
+    failures.append(mismatches(routes, "depot start", 1.0, starts, 0.5))
+    failures.append(mismatches(routes, "depot end", 1.0, ends, 0.5))
+    failures.append(mismatches(routes, "depot inside route", 0.0, inside, 0.5))
+
+    # Capacity, counting every stop on the route as check_capacity does
+    stops, lengths = durations.encode(paths)
+    boxes = durations.vector(demand_by_store)
+    loads = np.where(np.arange(stops.shape[1]) < lengths[:, None], boxes[stops], 0.0).sum(axis=1)
+    over = loads > max_boxes
+    failures.append(
+        pd.DataFrame(
+            {
+                "route": np.asarray(routes, dtype=object)[over],
+                "check": "capacity: more than " + str(max_boxes) + " boxes",
+                "expected": float(max_boxes),
+                "got": loads[over],
+            }
+        )
+    )
+
+    # Durations through each implementation
+    engine_travel = duration_engine.travel_seconds(durations.array, stops, lengths)
+    engine_unloading = duration_engine.unloading_seconds(boxes, stops, lengths, unload_minutes_per_box)
+    engine_total = engine_travel + engine_unloading
+
+    lookup_travel = compute_travel_seconds_batch(paths, lookup)
+    lookup_unloading = np.array(
+        [compute_unloading_seconds(path, demand_by_store, depot, unload_minutes_per_box) for path in paths]
+    )
+    failures.append(mismatches(routes, "travel: lookup vs engine", engine_travel, lookup_travel, tol))
+    failures.append(mismatches(routes, "unloading: lookup vs engine", engine_unloading, lookup_unloading, tol))
+
+    # The route strings as written, with route_gen's per-route box totals (every stop counted)
+    find_total = find_duration(routes, durations.array, durations.index, loads)
+    failures.append(mismatches(routes, "total: find_duration vs engine", engine_total, find_total, tol))
+
+    # The table's own columns
+    for column, expected in (
+        ("travel_seconds", engine_travel),
+        ("unloading_seconds", engine_unloading),
+        ("total_time_seconds", engine_total),
+        ("total_cost", compute_costs(engine_total)[4]),
+    ):
+        if column in table:
+            failures.append(mismatches(routes, column + ": table vs engine", expected, table[column], tol))
+
+    failures = pd.concat(failures, ignore_index=True)
+    print(
+        str(len(routes)) + " routes, " + str(int(over.sum())) + " over capacity, "
+        + str(failures["route"].nunique()) + " with any failure"
+    )
+    return failures
+
+
 def run_sample_route_check(lookup, demand_by_store):
     # Run a single sample route through time + cost and print a summary
     sample_route = ["Centre Port", "Woolworths Aotea", "Woolworths Karori", "Centre Port"]
@@ -47,24 +165,11 @@ def run_sample_route_check(lookup, demand_by_store):
     # Base minutes + OT minutes should equal total minutes
     assert close_enough(base_m + ot_m, total_minutes), "Base + OT minutes should equal total minutes"
 
-    
-# Run tests
-print("\nRunning simple tests...")
-check_depot_starts_and_ends(tours_std, start, sample_size=10)
-check_capacity(tours_std, demand_weekdays, max_demand_standard, sample_size=10)
-run_sample_route_check(lookup, demand_weekdays)
-print("All simple tests passed")
-
-
-
-
 
 # Compare Ivy's duration vs Vishwas's
-from duration_calculator import find_duration
-
-def compare_ivy_and_vishwas(lookup, demand_by_store, duration_df):
+def compare_ivy_and_vishwas(lookup, demand_by_store, durations):
     # Build index map directly from first column of CSV
-    index_map = {name: i for i, name in enumerate(duration_df.iloc[:, 0])}
+    index_map = durations.index
 
     # Define a sample route in both formats
     sample_route_list = ["Centre Port", "Woolworths Aotea", "Woolworths Karori", "Centre Port"]
@@ -78,7 +183,7 @@ def compare_ivy_and_vishwas(lookup, demand_by_store, duration_df):
     # Ivy calculation 
     tours = [sample_route_str]
     demand_total = [sum(demand_by_store.get(stop, 0) for stop in sample_route_list)]
-    ivy_total_seconds = find_duration(tours, duration_df, index_map, demand_total)[0]
+    ivy_total_seconds = find_duration(tours, durations.array, index_map, demand_total)[0]
     ivy_total_minutes = ivy_total_seconds / 60.0
 
     # Print results side by side
@@ -90,6 +195,41 @@ def compare_ivy_and_vishwas(lookup, demand_by_store, duration_df):
     assert close_enough(vish_total_minutes, ivy_total_minutes), "Mismatch between Ivy and Vishwas durations!"
     print("✅ Ivy and Vishwas agree on route duration")
 
-# Run comparison 
-duration_df = pd.read_csv(matrix_csv)
-compare_ivy_and_vishwas(lookup, demand_weekdays, duration_df)
+
+if __name__ == "__main__":
+    from store_data import DEMAND_WEEKDAYS, DEPOT, MATRIX_CSV, MAX_DEMAND_EXTRA, MAX_DEMAND_STANDARD
+
+    # The tables RouteCost&Duration writes ("Routes with Duration & per box - *.csv") can be passed instead
+    standard_csv, extra_csv = sys.argv[1:3] if len(sys.argv) > 2 else (
+        "Routes with Duration & Cost break up - Standard.csv",
+        "Routes with Duration & Cost break up - Extra.csv",
+    )
+    durations = DurationMatrix.from_csv(MATRIX_CSV)
+    lookup = durations.lookup()
+    pools = [
+        (standard_csv, MAX_DEMAND_STANDARD),
+        (extra_csv, MAX_DEMAND_EXTRA),
+    ]
+
+    failed = False
+    for routes_csv, max_boxes in pools:
+        print("\n=== " + routes_csv + " ===")
+        start = time.perf_counter()
+        failures = validate_routes(pd.read_csv(routes_csv), durations, lookup, DEMAND_WEEKDAYS, max_boxes, DEPOT)
+        print("Validated in " + str(round(time.perf_counter() - start, 3)) + " s")
+        if len(failures):
+            failed = True
+            print(failures.groupby("check").size().to_string())
+            print(failures.head(20).to_string(index=False))
+
+    # Run tests
+    print("\nRunning simple tests...")
+    tours_std = [route.split("->") for route in pd.read_csv(pools[0][0])["route"]]
+    check_depot_starts_and_ends(tours_std, DEPOT)
+    check_capacity(tours_std, DEMAND_WEEKDAYS, MAX_DEMAND_STANDARD)
+    run_sample_route_check(lookup, DEMAND_WEEKDAYS)
+    print("All simple tests passed")
+
+    # Run comparison
+    compare_ivy_and_vishwas(lookup, DEMAND_WEEKDAYS, durations)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,179 @@
+"""
+Run many planning what-ifs in parallel.
+
+A scenario grid file (JSON, or YAML if PyYAML is installed) looks like
+
+    {
+      "base": {"max_demand_standard": 9},
+      "grid": {"day": ["weekdays", "saturdays"], "sub60_route_cost": [800, 1000]},
+      "scenarios": [{"name": "cheap OT", "ot_rate_per_hr": 220}]
+    }
+
+Every combination of the "grid" values is run on top of "base", plus each
+entry of "scenarios". Any key left out falls back to today's values.
+The duration matrix is put in shared memory once and every worker process
+attaches to it instead of receiving a pickled copy.
+
+    python scenario_runner.py scenarios.json --out scenario_results.csv
+"""
+import importlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import plan
+import van_schedule_solver
+from duration_matrix import DurationMatrix
+from plan import DEMANDS
+from store_data import (
+    MATRIX_CSV,
+    MAX_DEMAND_EXTRA,
+    MAX_DEMAND_STANDARD,
+    MAX_INTERMEDIATE,
+    UNLOAD_MINUTES_PER_BOX,
+)
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+DEFAULTS = {
+    "day": "weekdays",
+    "max_demand_standard": MAX_DEMAND_STANDARD,
+    "max_demand_extra": MAX_DEMAND_EXTRA,
+    "max_intermediate": MAX_INTERMEDIATE,
+    "best_order": True,
+    "unload_minutes_per_box": UNLOAD_MINUTES_PER_BOX,
+    "shift_minutes": route_cost.SHIFT_MINUTES,
+    "base_rate_per_hr": route_cost.BASE_RATE_PER_HR,
+    "ot_rate_per_hr": route_cost.OT_RATE_PER_HR,
+    "sub60_route_cost": van_schedule_solver.SUB60_ROUTE_COST,
+    "annual_van_cost": van_schedule_solver.ANNUAL_VAN_COST,
+    "working_days": van_schedule_solver.WORKING_DAYS,
+}
+
+# Set in each worker by _attach_durations
+_durations = None
+_shm = None
+
+
+def load_grid(path):
+    """Expand a scenario grid file into a list of complete scenario dicts."""
+    path = Path(path)
+    text = path.read_text()
+    if path.suffix in (".yaml", ".yml"):
+        import yaml
+
+        spec = yaml.safe_load(text)
+    else:
+        spec = json.loads(text)
+    if isinstance(spec, list):
+        spec = {"scenarios": spec}
+
+    base = {**DEFAULTS, **spec.get("base", {})}
+    grid = spec.get("grid", {})
+    scenarios = []
+    for values in itertools.product(*grid.values()):
+        scenarios.append({**base, **dict(zip(grid, values))})
+    for scenario in spec.get("scenarios", []):
+        scenarios.append({**base, **scenario})
+
+    for number, scenario in enumerate(scenarios):
+        unknown = set(scenario) - set(DEFAULTS) - {"name", "demand"}
+        if unknown:
+            raise ValueError(f"Unknown scenario settings: {sorted(unknown)}")
+        scenario.setdefault(
+            "name", f"scenario {number}" if not grid else ", ".join(f"{k}={scenario[k]}" for k in grid)
+        )
+    return scenarios
+
+
+def run_scenario(scenario, durations):
+    start = time.perf_counter()
+    pools = plan.costed_pools(
+        durations,
+        scenario.get("demand") or DEMANDS[scenario["day"]],
+        scenario["max_demand_standard"],
+        scenario["max_demand_extra"],
+        scenario["max_intermediate"],
+        scenario["best_order"],
+        scenario["unload_minutes_per_box"],
+        use_cache=False,
+        shift_minutes=scenario["shift_minutes"],
+        base_rate_per_hr=scenario["base_rate_per_hr"],
+        ot_rate_per_hr=scenario["ot_rate_per_hr"],
+    )
+    routes_df = plan.routes_frame(pools, scenario["sub60_route_cost"])
+    if routes_df.empty:
+        return {
+            "name": scenario["name"],
+            **{key: scenario[key] for key in DEFAULTS},
+            "status": "Optimal",
+            "objective": 0.0,
+            "vans_retained": 0,
+            "routes_in_pool": 0,
+            "chosen_routes": "",
+            "seconds": time.perf_counter() - start,
+        }
+
+    daily_van_cost = scenario["annual_van_cost"] / scenario["working_days"]
+    result = van_schedule_solver.SolverSession(routes_df, daily_van_cost).solve()
+
+    return {
+        "name": scenario["name"],
+        **{key: scenario[key] for key in DEFAULTS},
+        "status": result["status"],
+        "objective": result["objective"],
+        "vans_retained": result["vans"],
+        "routes_in_pool": len(routes_df),
+        "chosen_routes": " | ".join(
+            f"{van_type}: {route}" for route, van_type in result["chosen"][["route", "van_type"]].itertuples(index=False)
+        ),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _attach_durations(spec):
+    global _durations, _shm
+    _shm, _durations = DurationMatrix.attach(spec)
+
+
+def _run_in_worker(scenario):
+    return run_scenario(scenario, _durations)
+
+
+def run_scenarios(scenarios, durations, workers=None):
+    """Run every scenario over a process pool and return one results table, in scenario order."""
+    shm, spec = durations.to_shared()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_attach_durations,
+            initargs=(spec,),
+        ) as pool:
+            results = list(pool.map(_run_in_worker, scenarios))
+    finally:
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a grid of planning scenarios in parallel")
+    parser.add_argument("grid", help="scenario grid file (.json, .yaml)")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default="scenario_results.csv", help="results table")
+    args = parser.parse_args()
+
+    scenarios = load_grid(args.grid)
+    start = time.perf_counter()
+    results = run_scenarios(scenarios, DurationMatrix.from_csv(args.matrix), args.workers)
+    results.to_csv(args.out, index=False)
+    print(results[["name", "status", "objective", "vans_retained", "routes_in_pool"]].to_string(index=False))
+    print(f"{len(scenarios)} scenarios in {time.perf_counter() - start:.1f} s, saved to {args.out}")
@@ -0,0 +1,45 @@
+# Store list and demand (boxes per store) shared by the newer entry points,
+# spelled the way the route CSVs spell them.
+
+DEPOT = "Centre Port"
+
+DEMAND_WEEKDAYS = {
+    "FreshChoice Cannons Creek": 3,
+    "FreshChoice Cuba Street": 2,
+    "FreshChoice Woburn": 2,
+    "Metro Cable Car Lane": 2,
+    "Woolworths Aotea": 3,
+    "Woolworths Crofton Downs": 4,
+    "Woolworths Johnsonville": 4,
+    "Woolworths Johnsonville Mall": 3,
+    "Woolworths Karori": 3,
+    "Woolworths Kilbirnie": 3,
+    "Woolworths Lower Hutt": 3,
+    "Woolworths Maidstone": 4,
+    "Woolworths Newtown": 3,
+    "Woolworths Petone": 3,
+    "Woolworths Porirua": 4,
+    "Woolworths Queensgate": 3,
+    "Woolworths Tawa": 2,
+    "Woolworths Upper Hutt": 3,
+    "Woolworths Wainuiomata": 4,
+    "Centre Port": 0,
+}
+
+# Saturday demand has not been estimated yet
+DEMAND_SATURDAYS = {store: 0 for store in DEMAND_WEEKDAYS}
+
+STORES = [store for store in DEMAND_WEEKDAYS if store != DEPOT]
+
+MATRIX_CSV = "WoolworthsDurations2025.csv"
+
+# Van capacities in boxes
+MAX_DEMAND_STANDARD = 9
+MAX_DEMAND_EXTRA = 4
+MAX_INTERMEDIATE = 4
+UNLOAD_MINUTES_PER_BOX = 15
+
+
+def delivered(demand):
+    """The stores to visit: those with boxes (and the depot)."""
+    return {store: boxes for store, boxes in demand.items() if boxes > 0 or store == DEPOT}
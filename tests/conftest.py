@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from duration_matrix import DurationMatrix  # noqa: E402
+from store_data import DEMAND_WEEKDAYS, DEPOT, MATRIX_CSV, STORES  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def durations():
+    """The durations CSV when it is checked out next to the code, else a seeded stand-in over the same stores."""
+    if (ROOT / MATRIX_CSV).exists():
+        return DurationMatrix.from_csv(ROOT / MATRIX_CSV, use_cache=False)
+    names = STORES + ["CentrePort Wellington"]
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 40, size=(len(names), 2))
+    array = np.sqrt(((xy[:, None] - xy[None]) ** 2).sum(-1)) * 60 + rng.uniform(0, 120, (len(names), len(names)))
+    np.fill_diagonal(array, 0.0)
+    return DurationMatrix(names, np.round(array, 2))
+
+
+@pytest.fixture
+def demand():
+    """Weekday demand over the first ten stores."""
+    return {store: DEMAND_WEEKDAYS[store] for store in STORES[:10]} | {DEPOT: 0}
@@ -0,0 +1,65 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pulp
+import pytest
+
+import column_generation
+import route_gen
+import van_schedule_solver
+from duration_matrix import DurationMatrix
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+def full_model(durations, demand):
+    """build_model over every best-ordered WW and SUB60 route."""
+    rows = []
+    for van_type, max_demand in (("WW", 9), ("SUB60", 4)):
+        for path, total, travel in route_gen.best_tours(demand, demand, DEPOT, max_demand, durations.seconds, 4):
+            seconds = travel + total * 15 * 60
+            cost = route_cost.compute_costs(seconds)[4] if van_type == "WW" else van_schedule_solver.SUB60_ROUTE_COST
+            rows.append({"route": "->".join(path), "total_cost": float(cost), "van_type": van_type})
+    return van_schedule_solver.build_model(pd.DataFrame(rows))
+
+
+def test_column_generation_lp_bound_matches_full_lp(durations, demand):
+    model = full_model(durations, demand)[0]
+    for variable in model.variables():
+        variable.cat = pulp.LpContinuous
+    model.solve(pulp.PULP_CBC_CMD(msg=False))
+    full_lp = pulp.value(model.objective)
+
+    result = column_generation.solve_column_generation(durations, demand)
+    assert result["converged"]
+    assert result["lp_bound"] == pytest.approx(full_lp, rel=1e-6)
+
+
+def test_column_generation_schedule_is_bounded_by_full_model(durations, demand):
+    model = full_model(durations, demand)[0]
+    model.solve(pulp.PULP_CBC_CMD(msg=False))
+    full_optimum = pulp.value(model.objective)
+
+    result = column_generation.solve_column_generation(durations, demand)
+    assert result["status"] == "Optimal"
+    assert result["lp_bound"] <= full_optimum + 1e-6
+    assert result["objective"] >= full_optimum - 1e-6
+    visited = [store for route in result["chosen"]["route"] for store in route.split("->")[1:-1]]
+    assert sorted(visited) == sorted(store for store in demand if store != DEPOT)
+
+
+def test_no_lp_bound_when_pricing_is_cut_short(durations, demand):
+    result = column_generation.solve_column_generation(durations, demand, max_rounds=1)
+    assert not result["converged"]
+    assert result["lp_bound"] is None
+    assert result["status"] == "Optimal"
+
+
+def test_store_without_a_leg_from_the_depot_is_an_error(durations, demand):
+    store = next(store for store in demand if store != DEPOT)
+    array = np.array(durations.array)
+    array[durations.index_of(DEPOT), durations.index_of(store)] = np.nan
+    with pytest.raises(ValueError, match=store):
+        column_generation.solve_column_generation(DurationMatrix(durations.names, array), demand)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import duration_engine
+
+DEPOT = "CentrePort Wellington"
+NAMES = [DEPOT, "Woolworths Aotea", "Woolworths Karori", "Woolworths Newtown", "Woolworths Petone"]
+INDEX = {name: i for i, name in enumerate(NAMES)}
+TOURS = [
+    [DEPOT, "Woolworths Aotea", DEPOT],
+    [DEPOT, "Woolworths Karori", "Woolworths Newtown", "Woolworths Petone", DEPOT],
+    [DEPOT, "Woolworths Petone", "Woolworths Karori", DEPOT],
+]
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(1)
+    matrix = np.round(rng.uniform(60, 900, (len(NAMES), len(NAMES))), 2)
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+
+def leg_by_leg(matrix, tour):
+    return sum(matrix[INDEX[a], INDEX[b]] for a, b in zip(tour, tour[1:]))
+
+
+def test_encode_tours_pads_each_tour_after_its_stops():
+    stops, lengths = duration_engine.encode_tours(["->".join(tour) for tour in TOURS], INDEX, pad=-1)
+    assert lengths.tolist() == [3, 5, 4]
+    for row, length, tour in zip(stops, lengths, TOURS):
+        assert [NAMES[i] for i in row[:length]] == tour
+        assert (row[length:] == -1).all()
+
+
+def test_travel_seconds_matches_summing_leg_by_leg(matrix):
+    stops, lengths = duration_engine.encode_tours(TOURS, INDEX)
+    np.testing.assert_allclose(
+        duration_engine.travel_seconds(matrix, stops, lengths), [leg_by_leg(matrix, tour) for tour in TOURS]
+    )
+
+
+def test_a_missing_leg_only_spoils_its_own_tour(matrix):
+    matrix[INDEX["Woolworths Karori"], INDEX["Woolworths Newtown"]] = np.nan
+    stops, lengths = duration_engine.encode_tours(TOURS, INDEX)
+    travel = duration_engine.travel_seconds(matrix, stops, lengths)
+    assert np.isnan(travel).tolist() == [False, True, False]
+
+
+def test_unloading_counts_the_stores_between_the_depots():
+    boxes = np.array([5.0, 1.0, 2.0, 3.0, 4.0])
+    stops, lengths = duration_engine.encode_tours(TOURS, INDEX)
+    np.testing.assert_allclose(
+        duration_engine.unloading_seconds(boxes, stops, lengths, 15), [1 * 900, 9 * 900, 6 * 900]
+    )
+
+
+def test_find_duration_starts_every_tour_at_the_depot(matrix):
+    frame = pd.DataFrame(matrix, columns=NAMES)
+    frame.insert(0, "", NAMES)
+    tours = ["->".join(tour[1:]) for tour in TOURS]
+    expected = [leg_by_leg(matrix, tour) + total * 900 for tour, total in zip(TOURS, [1, 9, 6])]
+    np.testing.assert_allclose(duration_engine.find_duration(tours, frame, INDEX, [1, 9, 6]), expected)
+    np.testing.assert_allclose(duration_engine.find_duration(tours, matrix, INDEX, [1, 9, 6]), expected)
+
+
+def test_lookup_matrix_leaves_missing_legs_nan(matrix):
+    lookup = {(a, b): matrix[i, j] for a, i in INDEX.items() for b, j in INDEX.items()}
+    del lookup[("Woolworths Aotea", DEPOT)]
+    index, rebuilt = duration_engine.lookup_matrix(lookup)
+    assert set(index) == set(NAMES)
+    for (a, b), seconds in lookup.items():
+        assert rebuilt[index[a], index[b]] == seconds
+    assert np.isnan(rebuilt[index["Woolworths Aotea"], index[DEPOT]])
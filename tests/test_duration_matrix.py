@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from duration_matrix import CACHE_DIR_NAME, DurationMatrix
+
+NAMES = ["CentrePort Wellington", "Woolworths Aotea", "Woolworths Karori", "Woolworths Newtown"]
+
+
+def write_matrix(path, array, names=NAMES, columns=None):
+    frame = pd.DataFrame(array, columns=columns or names)
+    frame.insert(0, "", names)
+    frame.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def array():
+    array = np.arange(16, dtype=np.float64).reshape(4, 4) * 60
+    array[1, 2] = np.nan
+    return array
+
+
+def test_route_spellings_resolve_to_matrix_rows(array):
+    durations = DurationMatrix(NAMES, array)
+    assert durations.index_of("Centre Port") == durations.index_of("CentrePort Wellington") == 0
+    assert durations.index_of(" Woolworths Karori ") == 2
+    assert durations.seconds("Centre Port", "Woolworths Newtown") == 180.0
+    assert durations.seconds("Woolworths Aotea", "Woolworths Karori") is None
+    custom = DurationMatrix(NAMES, array, aliases={"Depot": "CentrePort Wellington"})
+    assert custom.index_of("Depot") == 0
+    with pytest.raises(KeyError):
+        custom.index_of("Centre Port")
+
+
+def test_lookup_keeps_every_leg_but_the_missing_ones(array):
+    lookup = DurationMatrix(NAMES, array).lookup()
+    assert len(lookup) == 15
+    assert lookup[("CentrePort Wellington", "Woolworths Newtown")] == 180.0
+    assert ("Woolworths Aotea", "Woolworths Karori") not in lookup
+
+
+def test_csv_columns_are_put_in_origin_order(tmp_path, array):
+    shuffled = [NAMES[i] for i in (2, 0, 3, 1)]
+    matrix_csv = write_matrix(tmp_path / "durations.csv", array[:, [2, 0, 3, 1]], columns=shuffled)
+    durations = DurationMatrix.from_csv(matrix_csv, use_cache=False)
+    assert durations.names == NAMES
+    np.testing.assert_array_equal(durations.array, array)
+
+
+def test_mismatched_origins_and_destinations_are_an_error(tmp_path, array):
+    columns = NAMES[:3] + ["Woolworths Petone"]
+    matrix_csv = write_matrix(tmp_path / "durations.csv", array, columns=columns)
+    with pytest.raises(ValueError, match="do not match"):
+        DurationMatrix.from_csv(matrix_csv, use_cache=False)
+
+
+def test_binary_cache_is_reused_until_the_csv_changes(tmp_path, array):
+    matrix_csv = write_matrix(tmp_path / "durations.csv", array)
+    first = DurationMatrix.from_csv(matrix_csv)
+    cached = sorted(path.name for path in (tmp_path / CACHE_DIR_NAME).iterdir())
+    assert [name.rsplit(".", 1)[1] for name in cached] == ["json", "npy"]
+    np.testing.assert_array_equal(first.array, array)
+
+    # a second load memory-maps the cached copy instead of parsing the CSV
+    again = DurationMatrix.from_csv(matrix_csv)
+    assert isinstance(again.array, np.memmap)
+    assert again.names == NAMES
+    np.testing.assert_array_equal(again.array, array)
+
+    write_matrix(matrix_csv, array * 2)
+    changed = DurationMatrix.from_csv(matrix_csv)
+    np.testing.assert_array_equal(changed.array, array * 2)
+    assert len(list((tmp_path / CACHE_DIR_NAME).iterdir())) == 4
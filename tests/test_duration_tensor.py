@@ -0,0 +1,59 @@
+import importlib
+
+import numpy as np
+import pytest
+
+import duration_engine
+import route_gen
+from duration_matrix import DurationTensor
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.fixture
+def tours(demand):
+    return [path for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)]
+
+
+@pytest.mark.parametrize("factor", [1.0, 1.5])
+def test_a_flat_profile_costs_like_the_static_matrix(durations, demand, tours, factor):
+    static = route_cost.cost_columns(tours, durations.lookup(), demand)
+    tensor = DurationTensor.from_profile(durations, [factor] * 4, slice_minutes=60)
+    timed = route_cost.cost_columns(tours, None, demand, tensor=tensor, departure_minutes=90)
+
+    assert timed["route"] == static["route"]
+    np.testing.assert_allclose(timed["travel_seconds"], static["travel_seconds"] * factor)
+    np.testing.assert_allclose(timed["unloading_seconds"], static["unloading_seconds"])
+    if factor == 1.0:
+        for name, values in static.items():
+            if name != "route":
+                np.testing.assert_allclose(timed[name], values, err_msg=name)
+
+
+def test_each_leg_is_read_from_the_slice_it_starts_in(durations, demand, tours):
+    slice_minutes = 30
+    tensor = DurationTensor.from_profile(durations, [1.0, 2.0, 3.0], slice_minutes)
+    stops, lengths = duration_engine.encode_tours(
+        [[route_cost.norm(stop) for stop in path] for path in tours], tensor.index
+    )
+    boxes = np.zeros(len(tensor))
+    for store, count in demand.items():
+        boxes[tensor.index_of(store)] = count
+    got = duration_engine.timed_travel_seconds(tensor.array, tensor.slice_seconds, stops, lengths, boxes, 15, 600.0)
+
+    for path, travel in zip(tours, got):
+        clock, expected = 600.0, 0.0
+        for k, (a, b) in enumerate(zip(path, path[1:])):
+            leg = tensor.at(clock / 60).seconds(a, b)
+            expected += leg
+            clock += leg + (demand[b] * 15 * 60 if k + 2 < len(path) else 0.0)
+        assert travel == pytest.approx(expected)
+
+
+def test_at_clamps_to_the_last_slice(durations):
+    tensor = DurationTensor.from_profile(durations, [1.0, 2.0], slice_minutes=60)
+    np.testing.assert_array_equal(tensor.at(59.9).array, durations.array)
+    np.testing.assert_array_equal(tensor.at(60).array, 2 * np.asarray(durations.array))
+    np.testing.assert_array_equal(tensor.at(600).array, 2 * np.asarray(durations.array))
+    assert tensor.index_of("Centre Port") == durations.index_of("Centre Port")
@@ -0,0 +1,57 @@
+import importlib
+import time
+
+import pytest
+
+import plan
+import van_schedule_solver
+from heuristic_planner import HeuristicPlanner, warm_start
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.fixture
+def solution(durations, demand):
+    return HeuristicPlanner(durations, demand).solve(time_limit=0.2, seed=1)
+
+
+def test_schedule_visits_every_store_once_within_capacity(durations, demand, solution):
+    visited = []
+    for route, van_type, cost in zip(solution["routes"], solution["van_types"], solution["costs"]):
+        path = route.split("->")
+        assert path[0] == path[-1] == DEPOT
+        stores = path[1:-1]
+        visited += stores
+        assert len(stores) <= 4
+        assert sum(demand[store] for store in stores) <= (9 if van_type == "WW" else 4)
+        if van_type == "WW":
+            seconds = sum(durations.seconds(a, b) for a, b in zip(path, path[1:]))
+            seconds += sum(demand[store] for store in stores) * 15 * 60
+            assert cost == pytest.approx(route_cost.compute_costs(seconds)[4])
+        else:
+            assert cost == van_schedule_solver.SUB60_ROUTE_COST
+    assert sorted(visited) == sorted(store for store in demand if store != DEPOT)
+
+    vans = -(-solution["van_types"].count("WW") // 2)
+    assert solution["vans"] == vans
+    assert solution["objective"] == pytest.approx(sum(solution["costs"]) + vans * van_schedule_solver.DAILY_VAN_COST)
+    assert [cost for _, cost in solution["history"]] == sorted((cost for _, cost in solution["history"]), reverse=True)
+
+
+def test_time_limit_is_honoured(durations, demand):
+    start = time.perf_counter()
+    result = HeuristicPlanner(durations, demand).solve(time_limit=0.01, seed=0)
+    assert time.perf_counter() - start < 0.5
+    assert result["routes"]
+
+
+def test_warm_start_reaches_the_mip_optimum(durations, demand, solution):
+    routes_df = plan.routes_frame(plan.costed_pools(durations, demand, use_cache=False))
+    optimum = van_schedule_solver.SolverSession(routes_df).solve()["objective"]
+    assert solution["objective"] >= optimum - 1e-6
+
+    session = van_schedule_solver.SolverSession(routes_df)
+    ids = warm_start(session, solution)
+    assert len(ids) == len(solution["routes"])
+    assert session.solve()["objective"] == pytest.approx(optimum)
@@ -0,0 +1,60 @@
+import json
+import tracemalloc
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    """instrumentation with fresh module state, put back after the test."""
+    fresh = {"_enabled": False, "_trace_path": None, "_profiler": None, "_memory": False, "_stages": [], "_open": []}
+    for name, value in fresh.items():
+        monkeypatch.setattr(instrumentation, name, value)
+    yield instrumentation
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_disabled_stages_record_nothing(tracing):
+    with tracing.stage("generate_tours") as stage:
+        stage.count("tours_kept", 3)
+        tracing.count("cache_hits")
+    assert stage is tracing._NULL_STAGE
+    assert tracing.trace() == {"stages": [], "counters": {}}
+
+
+def test_nested_stages_and_counters(tracing, tmp_path):
+    tracing.enable()
+    with tracing.stage("plan", day="weekdays"):
+        for tours in (2, 3):
+            with tracing.stage("generate_tours") as stage:
+                stage.count("tours_kept", tours)
+                tracing.count("cache_misses")
+
+    recorded = tracing.trace()
+    assert [(record["name"], record["parent"]) for record in recorded["stages"]] == [
+        ("generate_tours", "plan"),
+        ("generate_tours", "plan"),
+        ("plan", None),
+    ]
+    assert recorded["stages"][-1]["counters"] == {"day": "weekdays"}
+    assert recorded["counters"] == {"tours_kept": 5, "cache_misses": 2}
+    assert recorded["stages"][-1]["seconds"] >= sum(record["seconds"] for record in recorded["stages"][:2])
+
+    tracing.write_trace(tmp_path / "trace.json")
+    assert json.loads((tmp_path / "trace.json").read_text()) == json.loads(json.dumps(recorded))
+
+
+def test_memory_peak_covers_nested_stages(tracing):
+    tracing.enable(memory=True)
+    with tracing.stage("outer"):
+        block = bytearray(16 * 2**20)
+        del block
+        with tracing.stage("inner"):
+            block = bytearray(2**20)
+            del block
+    inner, outer = tracing.trace()["stages"]
+    assert 1 <= inner["peak_traced_mb"] < 16
+    assert outer["peak_traced_mb"] >= 16
@@ -0,0 +1,39 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+
+import route_gen
+from parallel_costing import parallel_cost_columns
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+def test_first_stop_partitions_cover_every_tour_once(demand):
+    every = [tuple(path) for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)]
+    parts = [
+        tuple(path)
+        for store in sorted(demand)
+        if store != DEPOT
+        for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3, first_stops={store})
+    ]
+    assert sorted(parts) == sorted(every)
+    assert len(parts) == len(set(parts))
+
+
+def test_parallel_columns_match_cost_columns(durations, demand):
+    paths = [path for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)]
+    expected = pd.DataFrame(route_cost.cost_columns(paths, durations.lookup(), demand))
+    expected = expected.sort_values("route").reset_index(drop=True)
+
+    one, two = (parallel_cost_columns(durations, demand, demand, 9, max_intermediate=3, workers=n) for n in (1, 2))
+    assert one["route"] == two["route"]
+    for name in expected.columns:
+        if name != "route":
+            np.testing.assert_array_equal(one[name], two[name])
+
+    first_stops = [route.split("->")[1] for route in one["route"]]
+    assert first_stops == sorted(first_stops)
+    got = pd.DataFrame(one).sort_values("route").reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import plan
+import scenario_runner
+from store_data import DEMAND_SATURDAYS, DEPOT
+
+
+@pytest.fixture
+def matrix_csv(durations, tmp_path):
+    path = tmp_path / "durations.csv"
+    frame = pd.DataFrame(np.asarray(durations.array), columns=durations.names)
+    frame.insert(0, "", durations.names)
+    frame.to_csv(path, index=False)
+    return path
+
+
+def test_saturday_needs_no_vans(matrix_csv, tmp_path):
+    result = plan.plan(matrix_csv, DEMAND_SATURDAYS, use_cache=False, out_dir=tmp_path / "out")
+    assert result["objective"] == 0
+    assert result["vans"] == 0
+    assert result["routes"] == 0
+    assert result["chosen"].empty
+    assert (tmp_path / "out" / plan.CHOSEN_FILE).exists()
+
+
+def test_stores_without_boxes_are_left_out(durations, demand):
+    store = next(store for store in demand if store != DEPOT)
+    pools = plan.costed_pools(durations, demand | {store: 0}, use_cache=False)
+    without = plan.costed_pools(durations, {s: boxes for s, boxes in demand.items() if s != store}, use_cache=False)
+    for van_type, columns in pools.items():
+        assert not any(store in route.split("->") for route in columns["route"])
+        assert sorted(columns["route"]) == sorted(without[van_type]["route"])
+
+
+def test_scenario_matches_plan(matrix_csv, durations, demand):
+    scenario = {**scenario_runner.DEFAULTS, "name": "test", "demand": demand}
+    result = scenario_runner.run_scenario(scenario, durations)
+    planned = plan.plan(matrix_csv, demand, use_cache=False)
+    assert result["objective"] == pytest.approx(planned["objective"])
+    assert result["routes_in_pool"] == planned["routes"]
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_rates_reach_the_route_costs(durations, demand, use_cache, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pools = plan.costed_pools(durations, demand, use_cache=use_cache, shift_minutes=120, ot_rate_per_hr=220)
+    for columns in pools.values():
+        expected = plan.route_cost.compute_costs(columns["total_time_seconds"], 120, plan.route_cost.BASE_RATE_PER_HR, 220)
+        np.testing.assert_allclose(columns["total_cost"], expected[4])
@@ -0,0 +1,112 @@
+import asyncio
+import http.client
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from planning_service import PlannerState, PlanningClient, PlanningService
+from store_data import DEMAND_WEEKDAYS, DEPOT, STORES
+
+DEMAND = {store: DEMAND_WEEKDAYS[store] for store in STORES[:8]} | {DEPOT: 0}
+
+
+@pytest.fixture(scope="module")
+def service(durations, tmp_path_factory):
+    """A one-worker service on a free port, run on an event loop in a background thread."""
+    matrix_csv = tmp_path_factory.mktemp("service") / "durations.csv"
+    frame = pd.DataFrame(np.asarray(durations.array), columns=durations.names)
+    frame.insert(0, "", durations.names)
+    frame.to_csv(matrix_csv, index=False)
+
+    planning = PlanningService(matrix_csv, workers=1, max_queue=0, demand=DEMAND)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(planning.start(port=0), loop).result(timeout=120)
+    client = PlanningClient(port=server.sockets[0].getsockname()[1])
+    yield planning, client
+    asyncio.run_coroutine_threadsafe(planning.close(), loop).result(timeout=60)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def fresh_objective(durations, demand):
+    return PlannerState(durations, demand=demand).session.solve()["objective"]
+
+
+def post(client, body):
+    connection = http.client.HTTPConnection(client.host, client.port, timeout=client.timeout)
+    try:
+        connection.request("POST", "/plan", body=body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_replan_matches_a_fresh_solve(durations, service):
+    _, client = service
+    assert client.health() == {"status": "ok"}
+    store = STORES[0]
+    result = client.plan(demand={store: 5})
+    assert result["status"] == "Optimal"
+    assert result["objective"] == pytest.approx(fresh_objective(durations, DEMAND | {store: 5}))
+    assert set(result["timings"]) == {"queued", "update", "solve", "total"}
+
+
+@pytest.mark.parametrize("boxes", ["x", -1, 2.5, True, None])
+def test_bad_demand_leaves_the_worker_in_sync(durations, service, boxes):
+    _, client = service
+    store = STORES[1]
+    with pytest.raises(RuntimeError, match="^400"):
+        client.plan(demand={store: boxes})
+
+    result = client.plan(demand={store: 7})
+    assert result["objective"] == pytest.approx(fresh_objective(durations, DEMAND | {store: 7}))
+    for route in result["routes"]:
+        if route["van_type"] == "WW":
+            stops = route["route"].split("->")[1:-1]
+            assert sum((DEMAND | {store: 7})[stop] for stop in stops) <= 9
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"[]",
+        b"3",
+        b'"plan"',
+        b"{not json",
+        b'{"demand": []}',
+        b'{"demand": {"Nowhere": 3}}',
+        b'{"demand": {"Centre Port": 3}}',
+        b'{"remove": "Woolworths Aotea"}',
+        b'{"daily_van_cost": -1}',
+        b'{"gap": "small"}',
+        b'{"bogus": 1}',
+    ],
+)
+def test_malformed_requests_get_400(service, body):
+    status, payload = post(service[1], body)
+    assert status == 400
+    assert "error" in payload
+
+
+def test_unknown_path_gets_404(service):
+    with pytest.raises(RuntimeError, match="^404"):
+        service[1]._request("GET", "/nothing")
+
+
+def test_full_queue_gets_503(service):
+    planning, client = service
+    rejected = client.stats()["rejected"]
+    planning.pending = planning.workers + planning.max_queue
+    try:
+        with pytest.raises(RuntimeError, match="^503"):
+            client.plan()
+    finally:
+        planning.pending = 0
+    assert client.stats()["rejected"] == rejected + 1
+    assert client.plan()["status"] == "Optimal"
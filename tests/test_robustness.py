@@ -0,0 +1,52 @@
+import importlib
+
+import numpy as np
+import pytest
+
+import robustness
+import route_gen
+import van_schedule_solver
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.fixture
+def schedule(durations, demand):
+    """A few best-ordered routes with their planned seconds."""
+    found = list(route_gen.best_tours(demand, demand, DEPOT, 9, durations.seconds, 3))[::7][:6]
+    routes = ["->".join(path) for path, _, _ in found]
+    planned = [travel + total * 15 * 60 for _, total, travel in found]
+    return routes, np.array(planned)
+
+
+def test_without_noise_every_sample_is_the_plan(durations, demand, schedule):
+    routes, planned = schedule
+    van_types = ["WW"] * (len(routes) - 1) + ["SUB60"]
+    result = robustness.evaluate_schedule(
+        routes, durations, demand, van_types=van_types, n_samples=50, demand_cv=0.0, travel_sigma=0.0,
+        chunk_size=16, seed=0,
+    )
+    table = result["routes"]
+    np.testing.assert_allclose(table["planned_minutes"], planned / 60.0)
+    np.testing.assert_allclose(table["mean_minutes"], planned / 60.0)
+    np.testing.assert_allclose(table["p95_minutes"], planned / 60.0)
+    assert table["overtime_probability"].tolist() == (planned / 60.0 > route_cost.SHIFT_MINUTES).tolist()
+
+    costs = np.append(route_cost.compute_costs(planned[:-1])[4], van_schedule_solver.SUB60_ROUTE_COST)
+    np.testing.assert_allclose(table["mean_cost"], costs)
+    vans = int(np.ceil((len(routes) - 1) / 2))
+    assert result["plan"]["vans"] == vans
+    np.testing.assert_allclose(result["plan_costs"], costs.sum() + vans * van_schedule_solver.DAILY_VAN_COST)
+
+
+def test_samples_are_seeded_and_centred_on_the_plan(durations, demand, schedule):
+    routes, planned = schedule
+    first = robustness.evaluate_schedule(routes, durations, demand, n_samples=4000, demand_cv=0.0, seed=3)
+    again = robustness.evaluate_schedule(routes, durations, demand, n_samples=4000, demand_cv=0.0, seed=3)
+    np.testing.assert_array_equal(first["plan_costs"], again["plan_costs"])
+
+    # lognormal leg factors have mean one, so the mean duration stays at the plan
+    np.testing.assert_allclose(first["routes"]["mean_minutes"], planned / 60.0, rtol=0.01)
+    assert (first["routes"]["p95_minutes"] > planned / 60.0).all()
+    assert first["plan"]["p5_cost"] <= first["plan"]["p50_cost"] <= first["plan"]["p95_cost"]
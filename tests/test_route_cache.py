@@ -0,0 +1,77 @@
+import importlib
+import os
+
+import numpy as np
+import pytest
+
+import route_cache
+import route_gen
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return route_cache.RouteCache(tmp_path / "cache")
+
+
+def costed(cache, durations, demand, **settings):
+    cache.hits.clear()
+    cache.misses.clear()
+    return route_cache.cached_cost_columns(cache, durations, set(demand), demand, DEPOT, 9, 3, **settings)
+
+
+@pytest.mark.parametrize("best_order", [False, True])
+def test_cached_columns_match_cost_columns(cache, durations, demand, best_order):
+    columns = costed(cache, durations, demand, best_order=best_order)
+    if best_order:
+        found = route_gen.best_tours(demand, demand, DEPOT, 9, durations.seconds, 3)
+    else:
+        found = route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)
+    expected = route_cost.cost_columns([path for path, _, _ in found], durations.lookup(), demand)
+
+    assert sorted(columns["route"]) == sorted(expected["route"])
+    order = np.argsort(columns["route"])
+    expected_order = np.argsort(expected["route"])
+    for name, values in expected.items():
+        if name != "route":
+            np.testing.assert_allclose(np.asarray(columns[name])[order], values[expected_order], err_msg=name)
+
+
+def test_only_layers_whose_inputs_changed_are_recomputed(cache, durations, demand):
+    first = costed(cache, durations, demand)
+    assert cache.misses == ["tours", "seconds", "money"]
+
+    again = costed(cache, durations, demand)
+    assert cache.hits == ["tours", "seconds", "money"] and not cache.misses
+    assert again["route"] == first["route"]
+    np.testing.assert_array_equal(again["total_cost"], first["total_cost"])
+
+    cheaper = costed(cache, durations, demand, ot_rate_per_hr=200.0)
+    assert (cache.hits, cache.misses) == (["tours", "seconds"], ["money"])
+    assert (cheaper["total_cost"] <= first["total_cost"]).all()
+
+    costed(cache, durations, demand, unload_minutes_per_box=10)
+    assert (cache.hits, cache.misses) == (["tours"], ["seconds", "money"])
+
+    store = next(store for store in demand if store != DEPOT)
+    costed(cache, durations, demand | {store: demand[store] + 1})
+    assert cache.misses == ["tours", "seconds", "money"]
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    cache = route_cache.RouteCache(tmp_path / "cache", max_bytes=0)
+    block = {"values": np.zeros(1000)}
+    cache.put("tours", "a", block)
+    # the entry just written stays even when it alone is over the cap
+    assert cache.get("tours", "a") is not None
+
+    cache.max_bytes = 2 * (tmp_path / "cache" / "tours-a.npz").stat().st_size
+    cache.put("tours", "b", block)
+    os.utime(tmp_path / "cache" / "tours-a.npz", (1, 1))
+    cache.put("tours", "c", block)
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == ["tours-b.npz", "tours-c.npz"]
+
+    cache.clear()
+    assert cache.get("tours", "c") is None
@@ -0,0 +1,55 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import route_gen
+import van_schedule_solver
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.fixture
+def tours(demand):
+    return [path for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)]
+
+
+def test_cost_columns_match_costing_route_by_route(durations, demand, tours):
+    lookup = durations.lookup()
+    # one missing leg: every tour using it is dropped
+    dropped = (route_cost.norm(tours[0][1]), route_cost.norm(DEPOT))
+    del lookup[dropped]
+
+    columns = route_cost.cost_columns(tours, lookup, demand)
+    expected = []
+    for path in tours:
+        travel = route_cost.compute_travel_seconds(path, lookup)
+        if travel is None:
+            continue
+        unloading = route_cost.compute_unloading_seconds(path, demand)
+        expected.append(("->".join(path), travel, unloading, *route_cost.compute_costs(travel + unloading)))
+
+    assert 0 < len(expected) < len(tours)
+    assert columns["route"] == [row[0] for row in expected]
+    for position, name in enumerate(
+        ["travel_seconds", "unloading_seconds", "base_minutes_billed", "overtime_minutes_billed",
+         "base_cost", "overtime_cost", "total_cost"],
+        start=1,
+    ):
+        np.testing.assert_allclose(columns[name], [row[position] for row in expected], err_msg=name)
+    np.testing.assert_allclose(columns["total_time_minutes"] * 60, columns["total_time_seconds"])
+
+
+def test_tables_are_written_in_every_format_and_read_back(durations, demand, tours, tmp_path):
+    full_csv, slim_csv = tmp_path / "full.csv", tmp_path / "slim.csv"
+    route_cost.save_csvs_with_costs(
+        tours, durations.lookup(), demand, full_csv, slim_csv, formats=("csv", "parquet")
+    )
+    full = pd.read_csv(full_csv)
+    slim = van_schedule_solver.read_routes(slim_csv)
+    assert slim_csv.with_suffix(".parquet").exists()
+    assert list(slim.columns) == ["route", "total_cost"]
+    assert slim["route"].tolist() == full["route"].tolist() == ["->".join(path) for path in tours]
+    np.testing.assert_allclose(slim["total_cost"], full["total_cost"])
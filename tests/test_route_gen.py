@@ -0,0 +1,65 @@
+import pytest
+
+import route_gen
+from store_data import DEPOT
+
+
+@pytest.mark.parametrize("max_demand, max_intermediate", [(9, 4), (4, 3)])
+def test_best_tours_is_fastest_ordering_of_every_feasible_store_set(durations, demand, max_demand, max_intermediate):
+    fastest = {}
+    for path, total, travel in route_gen.enumerate_tours(
+        demand, demand, DEPOT, max_demand, max_intermediate, leg_seconds=durations.seconds
+    ):
+        stores = frozenset(path[1:-1])
+        if stores not in fastest or travel < fastest[stores][1]:
+            fastest[stores] = (total, travel)
+
+    best = {}
+    for path, total, travel in route_gen.best_tours(
+        demand, demand, DEPOT, max_demand, durations.seconds, max_intermediate
+    ):
+        stores = frozenset(path[1:-1])
+        assert stores not in best, "one tour per store set"
+        assert path[0] == path[-1] == DEPOT
+        assert travel == pytest.approx(sum(durations.seconds(a, b) for a, b in zip(path, path[1:])))
+        best[stores] = (total, travel)
+
+    assert best.keys() == fastest.keys()
+    for stores, (total, travel) in fastest.items():
+        assert best[stores][0] == total
+        assert best[stores][1] == pytest.approx(travel)
+
+
+def test_enumerate_tours_yields_every_capacity_feasible_ordering(durations, demand):
+    stores = [store for store in demand if store != DEPOT][:6]
+    subset = {store: demand[store] for store in stores} | {DEPOT: 0}
+    tours = [tuple(path) for path, _, _ in route_gen.enumerate_tours(subset, subset, DEPOT, 9, 3)]
+    assert len(tours) == len(set(tours))
+
+    expected = set()
+
+    def extend(path, load):
+        for store in stores:
+            if store not in path and load + subset[store] <= 9:
+                expected.add((DEPOT, *path, store, DEPOT))
+                if len(path) < 2:
+                    extend(path + [store], load + subset[store])
+
+    extend([], 0)
+    assert set(tours) == expected
+
+
+def test_candidates_restrict_successors_and_count_what_they_skip(durations, demand):
+    stats = {}
+    unrestricted = list(route_gen.best_tours(demand, demand, DEPOT, 9, durations.seconds, 4, stats=stats))
+    assert stats["candidates_skipped"] == 0
+
+    candidates = route_gen.nearest_candidates(demand, DEPOT, durations.seconds, 3)
+    stats = {}
+    restricted = list(
+        route_gen.best_tours(demand, demand, DEPOT, 9, durations.seconds, 4, candidates=candidates, stats=stats)
+    )
+    assert stats["candidates_skipped"] > 0
+    assert 0 < len(restricted) < len(unrestricted)
+    for path, _, _ in restricted:
+        assert all(b in candidates[a] for a, b in zip(path[1:-2], path[2:-1]))
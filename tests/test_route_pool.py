@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from route_pool import RoutePool
+from store_data import DEMAND_WEEKDAYS, STORES
+
+
+def frame(pool):
+    return pool.to_frame().sort_values("route").reset_index(drop=True)
+
+
+def assert_same_routes(pool, rebuilt):
+    got, expected = frame(pool), frame(rebuilt)
+    assert got["route"].tolist() == expected["route"].tolist()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def apply(routes, change):
+    kept = routes[~routes["route"].isin(change.removed)]
+    return pd.concat([kept, change.added], ignore_index=True).sort_values("route").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("best_order", [False, True])
+def test_single_store_updates_match_a_full_rebuild(durations, demand, best_order):
+    pool = RoutePool.build(durations, demand, 9, best_order=best_order)
+    routes = frame(pool)
+    new_store = STORES[10]
+    updates = [
+        ("set_demand", STORES[0], 6),
+        ("set_demand", STORES[1], 1),
+        ("add_store", new_store, DEMAND_WEEKDAYS[new_store]),
+        ("remove_store", STORES[2], None),
+    ]
+    for method, store, boxes in updates:
+        if method == "remove_store":
+            change = pool.remove_store(store)
+            demand.pop(store)
+        else:
+            change = getattr(pool, method)(store, boxes)
+            demand[store] = boxes
+        # the change alone takes the previous pool to the new one
+        routes = apply(routes, change)
+        pd.testing.assert_frame_equal(routes, frame(pool), check_dtype=False)
+        assert_same_routes(pool, RoutePool.build(durations, demand, 9, best_order=best_order))
+
+
+def test_unknown_stores_are_rejected(durations, demand):
+    pool = RoutePool.build(durations, demand, 9)
+    with pytest.raises(KeyError):
+        pool.set_demand(STORES[15], 2)
+    with pytest.raises(ValueError):
+        pool.add_store(STORES[0], 2)
@@ -0,0 +1,52 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import route_gen
+import route_stream
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_streamed_tables_match_cost_columns(durations, demand, tmp_path, chunk_size):
+    full_csv, slim_csv = tmp_path / "full.csv", tmp_path / "slim.csv"
+    reports = []
+    totals = route_stream.stream_costed_routes(
+        durations, set(demand), demand, 9, full_csv, slim_csv, max_intermediate=3,
+        chunk_size=chunk_size, formats=("csv", "parquet"), tours_txt=tmp_path / "tours.txt",
+        on_chunk=reports.append,
+    )
+    paths = [path for path, _, _ in route_gen.enumerate_tours(set(demand), demand, DEPOT, 9, 3)]
+    expected = pd.DataFrame(route_cost.cost_columns(paths, durations.lookup(), demand))
+
+    full = pd.read_csv(full_csv)
+    assert list(full.columns) == route_stream.FULL_COLUMNS
+    pd.testing.assert_frame_equal(full, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(pd.read_parquet(full_csv.with_suffix(".parquet")), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(pd.read_csv(slim_csv), expected[["route", "total_cost"]], check_dtype=False)
+    assert (tmp_path / "tours.txt").read_text().splitlines() == expected["route"].tolist()
+
+    assert totals["tours"] == totals["routes"] == len(paths)
+    assert totals["chunks"] == len(reports) == -(-len(paths) // chunk_size)
+    assert [report["tours"] for report in reports[:-1]] == [chunk_size] * (len(reports) - 1)
+
+
+def test_a_run_without_routes_replaces_earlier_output(durations, demand, tmp_path):
+    full_csv, slim_csv = tmp_path / "full.csv", tmp_path / "slim.csv"
+    route_stream.stream_costed_routes(durations, set(demand), demand, 9, full_csv, slim_csv, max_intermediate=2)
+    assert len(pd.read_csv(full_csv))
+
+    totals = route_stream.stream_costed_routes(durations, set(demand), demand, 0, full_csv, slim_csv)
+    assert totals["routes"] == 0
+    assert pd.read_csv(full_csv).empty
+    assert list(pd.read_csv(slim_csv).columns) == ["route", "total_cost"]
+
+
+def test_chunked_keeps_order_and_the_remainder():
+    assert list(route_stream.chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(route_stream.chunked([], 3)) == []
+    np.testing.assert_array_equal(np.concatenate(list(route_stream.chunked(range(10), 4))), np.arange(10))
@@ -0,0 +1,37 @@
+import importlib
+
+import pandas as pd
+import pytest
+
+import route_gen
+import van_schedule_solver
+from store_data import DEPOT
+
+route_cost = importlib.import_module("RouteCost&Duration")
+
+
+@pytest.fixture
+def routes_df(durations, demand):
+    rows = []
+    for van_type, max_demand in (("WW", 9), ("SUB60", 4)):
+        for path, total, travel in route_gen.best_tours(demand, demand, DEPOT, max_demand, durations.seconds, 4):
+            cost = route_cost.compute_costs(travel + total * 15 * 60)[4] if van_type == "WW" else 1000
+            rows.append({"route": "->".join(path), "total_cost": float(cost), "van_type": van_type})
+    return pd.DataFrame(rows)
+
+
+def test_removing_a_chosen_route_matches_a_fresh_solve(routes_df):
+    session = van_schedule_solver.SolverSession(routes_df)
+    first = session.solve()
+    removed = int(first["chosen"]["id"].iloc[0])
+    var = session.x[removed]
+
+    session.remove_routes([removed])
+    assert var.varValue == 0
+    again = session.solve()
+    fresh = van_schedule_solver.SolverSession(routes_df.drop(index=removed)).solve()
+
+    assert again["status"] == fresh["status"] == "Optimal"
+    assert removed not in set(again["chosen"]["id"])
+    assert again["objective"] == pytest.approx(fresh["objective"])
+    assert again["objective"] >= first["objective"] - 1e-6
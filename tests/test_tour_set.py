@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+import duration_engine
+import route_gen
+import van_schedule_solver
+from tour_set import DEPOT, TourSet
+
+ROUTES = [
+    "Centre Port->Woolworths Karori->Woolworths Aotea->Centre Port",
+    "Centre Port->Woolworths Newtown->Centre Port",
+    "CentrePort Wellington->Woolworths Aotea->Woolworths Newtown->Woolworths Karori->CentrePort Wellington",
+]
+
+
+def test_route_strings_round_trip():
+    tours = TourSet.from_strings(ROUTES)
+    assert tours.names == ["Woolworths Aotea", "Woolworths Karori", "Woolworths Newtown"]
+    assert tours.stops.dtype == np.uint8
+    assert tours.lengths.tolist() == [2, 1, 3]
+    # either spelling of the depot is written back the way the route CSVs spell it
+    assert tours.to_strings() == ROUTES[:2] + [ROUTES[2].replace("CentrePort Wellington", DEPOT)]
+
+
+def test_demand_totals_count_each_tours_stores():
+    demand = {"Woolworths Aotea": 3, "Woolworths Karori": 4, "Woolworths Newtown": 2, DEPOT: 0}
+    tours = TourSet.from_strings(ROUTES, demand=demand)
+    assert tours.columns["demand"].tolist() == [7, 2, 9]
+
+
+def test_frame_columns_follow_subsets():
+    frame = pd.DataFrame({"route": ROUTES, "total_cost": [10.0, 20.0, 30.0], "van_type": ["WW", "SUB60", "WW"]})
+    tours = TourSet.from_frame(frame)
+    picked = tours.subset(tours.columns["van_type"] == "WW")
+    assert len(picked) == 2
+    assert picked.to_frame()["total_cost"].tolist() == [10.0, 30.0]
+    assert picked.to_paths()[1] == [DEPOT, "Woolworths Aotea", "Woolworths Newtown", "Woolworths Karori", DEPOT]
+    assert tours.subset(np.array([1])).to_strings() == [ROUTES[1]]
+
+
+def test_matrix_stops_give_each_tours_travel_time(durations, demand):
+    paths = [path for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)]
+    tours = TourSet.from_paths(paths)
+    stops, lengths = tours.matrix_stops(durations)
+    expected = [sum(durations.seconds(a, b) for a, b in zip(path, path[1:])) for path in paths]
+    np.testing.assert_allclose(duration_engine.travel_seconds(durations.array, stops, lengths), expected)
+
+
+def test_incidence_lists_the_tours_visiting_each_store(demand):
+    paths = [path for path, _, _ in route_gen.enumerate_tours(demand, demand, DEPOT, 9, 3)]
+    tours = TourSet.from_paths(paths)
+    indptr, indices = tours.incidence()
+    for s, store in enumerate(tours.names):
+        assert indices[indptr[s]:indptr[s + 1]].tolist() == [r for r, path in enumerate(paths) if store in path]
+
+
+def test_cover_constraints_hold_exactly_the_visiting_routes():
+    frame = pd.DataFrame({"route": ROUTES, "total_cost": [10.0, 20.0, 30.0], "van_type": ["WW", "SUB60", "WW"]})
+    model, x = van_schedule_solver.build_model(frame)[:2]
+    for store in TourSet.from_strings(ROUTES).names:
+        cover = model.constraints[f"Cover_{store}".replace(" ", "_")]
+        assert {var.name for var in cover} == {x[r].name for r, route in enumerate(ROUTES) if store in route}
+        assert cover.constant == -1
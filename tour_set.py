@@ -0,0 +1,128 @@
+import numpy as np
+
+from duration_matrix import ALIASES
+
+DEPOT = "Centre Port"
+SEPARATOR = "->"
+
+
+class TourSet:
+    """
+    Tours held as small integer arrays instead of "->"-joined strings.
+
+    Every tour starts and ends at the depot, so only the stores in between
+    are stored: stops[i, :lengths[i]] are indices into names. Per-tour values
+    (demand totals, travel seconds, costs, ...) live in the columns dict as
+    arrays of length n_tours. Route strings are only built or parsed at the
+    CSV boundary (from_strings / to_strings).
+    """
+
+    def __init__(self, names, stops, lengths, columns=None, depot=DEPOT):
+        self.names = list(names)
+        self.stops = stops
+        self.lengths = lengths
+        self.columns = dict(columns or {})
+        self.depot = depot
+        self.store_index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_paths(cls, paths, names=None, demand=None, depot=DEPOT):
+        """
+        Build from stop lists, with or without the depot at both ends.
+
+        names fixes the store vocabulary (defaults to every store seen, sorted);
+        demand, a store -> boxes dict, fills the "demand" column.
+        """
+        depots = {depot, ALIASES.get(depot, depot)}
+        paths = [[stop for stop in path if stop not in depots] for path in paths]
+        if names is None:
+            names = sorted({stop for path in paths for stop in path})
+        store_index = {name: i for i, name in enumerate(names)}
+
+        lengths = np.fromiter((len(path) for path in paths), dtype=np.uint8, count=len(paths))
+        stops = np.zeros((len(paths), int(lengths.max(initial=0))), dtype=_stop_dtype(len(names)))
+        for row, path in enumerate(paths):
+            stops[row, : len(path)] = [store_index[stop] for stop in path]
+
+        tours = cls(names, stops, lengths, depot=depot)
+        if demand is not None:
+            tours.columns["demand"] = tours.demand_totals(demand)
+        return tours
+
+    @classmethod
+    def from_strings(cls, routes, names=None, demand=None, depot=DEPOT):
+        return cls.from_paths(
+            (route.split(SEPARATOR) for route in routes), names=names, demand=demand, depot=depot
+        )
+
+    @classmethod
+    def from_frame(cls, df, names=None, demand=None, depot=DEPOT):
+        """Build from a routes table: the "route" column is parsed, every other column is kept."""
+        tours = cls.from_strings(df["route"], names=names, demand=demand, depot=depot)
+        for column in df.columns:
+            if column != "route":
+                tours.columns[column] = df[column].to_numpy()
+        return tours
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def to_paths(self):
+        return [
+            [self.depot] + [self.names[i] for i in row[:length]] + [self.depot]
+            for row, length in zip(self.stops.tolist(), self.lengths.tolist())
+        ]
+
+    def to_strings(self):
+        return [SEPARATOR.join(path) for path in self.to_paths()]
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({"route": self.to_strings(), **self.columns})
+
+    def subset(self, selector):
+        """New TourSet with the tours picked by a boolean mask or index array."""
+        return TourSet(
+            self.names,
+            self.stops[selector],
+            self.lengths[selector],
+            {name: values[selector] for name, values in self.columns.items()},
+            depot=self.depot,
+        )
+
+    def visit_mask(self):
+        """Boolean (n_tours, max_len) mask of the real (non-padding) stops."""
+        return np.arange(self.stops.shape[1]) < self.lengths[:, None]
+
+    def incidence(self):
+        """
+        Stores x tours incidence in CSR form: the tours visiting store s are
+        indices[indptr[s]:indptr[s + 1]], in increasing order.
+        """
+        tour_rows, positions = np.nonzero(self.visit_mask())
+        stores = self.stops[tour_rows, positions].astype(np.int64)
+        order = np.argsort(stores, kind="stable")
+        indptr = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(stores, minlength=len(self.names)), out=indptr[1:])
+        return indptr, tour_rows[order]
+
+    def demand_totals(self, demand):
+        """Boxes delivered by each tour, demand being a store -> boxes dict."""
+        boxes = np.array([demand.get(name, 0) for name in self.names], dtype=np.int64)
+        return np.where(self.visit_mask(), boxes[self.stops], 0).sum(axis=1)
+
+    def matrix_stops(self, durations):
+        """
+        Padded matrix-index array with the depot at both ends, plus lengths,
+        ready for duration_engine.travel_seconds.
+        """
+        to_matrix = np.array([durations.index_of(name) for name in self.names], dtype=np.int64)
+        depot = durations.index_of(self.depot)
+        stops = np.full((len(self), self.stops.shape[1] + 2), depot, dtype=np.int64)
+        stops[:, 1:-1] = np.where(self.visit_mask(), to_matrix[self.stops], depot)
+        return stops, self.lengths.astype(np.int64) + 2
+
+
+def _stop_dtype(n_names):
+    return np.uint8 if n_names <= np.iinfo(np.uint8).max + 1 else np.uint16
@@ -1,70 +1,334 @@
+import os
+import re
+import tempfile
+import time
 import pulp
 import pandas as pd
 import math
+from pathlib import Path
+import instrumentation
+from tour_set import SEPARATOR, TourSet
 
-# Load routes
-std_routes = pd.read_csv("Route and Total Cost - Standard.csv")
-sub_routes = pd.read_csv("Route and Total Cost - Extra.csv")
+# parameters
+ANNUAL_VAN_COST = 50000
+WORKING_DAYS = 312
 
-# Tag van types
-std_routes["van_type"] = "WW"
-sub_routes["van_type"] = "SUB60"
+# Assumption: Woolworths vans are used ~6 days/week × 52 weeks = 312 working days per year
+# Fixed daily van cost = 50,000 ÷ 312 ≈ 160 per van per day
+DAILY_VAN_COST = ANNUAL_VAN_COST / WORKING_DAYS   # ≈160
 
 # For SUB60: flat $1000 per route
-sub_routes["total_cost"] = 1000
+SUB60_ROUTE_COST = 1000
 
-# Merge into one dataframe
-routes_df = pd.concat([std_routes, sub_routes], ignore_index=True)
 
-# Build store set (exclude depot)
-stores = set()
-for r in routes_df["route"]:
-    stops = r.split("->")
-    for s in stops:
-        if s not in ("Centre Port", "CentrePort Wellington"):
-            stores.add(s)
+def read_routes(path):
+    """
+    Read a routes table, preferring the typed Parquet/Feather copy that
+    RouteCost&Duration.py writes next to the CSV when it is at least as new.
+    """
+    path = Path(path)
+    for suffix, reader in ((".parquet", pd.read_parquet), (".feather", pd.read_feather)):
+        binary = path.with_suffix(suffix)
+        if binary.exists() and (not path.exists() or binary.stat().st_mtime >= path.stat().st_mtime):
+            return reader(binary)
+    return pd.read_csv(path)
 
-R = list(routes_df["route"])
-S = list(stores)
 
-# Dicts
-cost = routes_df.set_index("route")["total_cost"].to_dict()
-van_type = routes_df.set_index("route")["van_type"].to_dict()
+def load_routes(std_csv="Route and Total Cost - Standard.csv", sub_csv="Route and Total Cost - Extra.csv"):
+    with instrumentation.stage("load_routes"):
+        return _load_routes(std_csv, sub_csv)
 
-# parameters
-ANNUAL_VAN_COST = 50000
-WORKING_DAYS = 312
 
-# Assumption: Woolworths vans are used ~6 days/week × 52 weeks = 312 working days per year
-# Fixed daily van cost = 50,000 ÷ 312 ≈ 160 per van per day
-DAILY_VAN_COST = ANNUAL_VAN_COST / WORKING_DAYS   # ≈160
+def _load_routes(std_csv, sub_csv):
+    # Load routes
+    std_routes = read_routes(std_csv)
+    sub_routes = read_routes(sub_csv)
+
+    # Tag van types
+    std_routes["van_type"] = "WW"
+    sub_routes["van_type"] = "SUB60"
+
+    # For SUB60: flat $1000 per route
+    sub_routes["total_cost"] = SUB60_ROUTE_COST
+
+    # Merge into one dataframe
+    routes = pd.concat([std_routes, sub_routes], ignore_index=True)
+    instrumentation.count("routes_loaded", len(routes))
+    return routes
+
+
+def build_model(routes_df, daily_van_cost=DAILY_VAN_COST):
+    """
+    Set-partitioning model over the routes in routes_df (columns route,
+    total_cost, van_type). Variables are keyed by row position, so the same
+    route string on a WW and a SUB60 van stays two separate choices.
+
+    Returns (model, x, V, tours, cover) where tours is the TourSet of
+    routes_df and cover maps each store to its Cover constraint.
+    """
+    # Parse the route strings once; the store set is the TourSet's vocabulary (depot excluded)
+    tours = TourSet.from_frame(routes_df)
+    R = range(len(tours))
+    cost = tours.columns["total_cost"].astype(float)
+    is_ww = tours.columns["van_type"] == "WW"
+
+    # Assemble model
+    model = pulp.LpProblem("Woolworths_Van_Scheduling", pulp.LpMinimize)
+
+    # Decision variables
+    x = pulp.LpVariable.dicts("x", R, cat="Binary")       # route chosen
+    V = pulp.LpVariable("Vans_retained", lowBound=0, cat="Integer")  # number of WW vans kept
+
+    # Objective: route costs + fixed daily van costs
+    model += pulp.LpAffineExpression([(x[r], cost[r]) for r in R]) + daily_van_cost * V, "TotalCost"
+
+    # Constraint (a): every store covered exactly once, only over the routes visiting it
+    indptr, indices = tours.incidence()
+    cover = {}
+    for s, store in enumerate(tours.names):
+        visiting = indices[indptr[s]:indptr[s + 1]].tolist()
+        cover[store] = pulp.LpAffineExpression([(x[r], 1) for r in visiting]) == 1
+        model += cover[store], f"Cover_{store}"
+
+    # Constraint (b): WW van capacity (each van can do 2 routes)
+    model += pulp.LpAffineExpression([(x[r], 1) for r in R if is_ww[r]]) <= 2 * V, "WW_VanCapacity"
+
+    instrumentation.count("routes", len(tours))
+    instrumentation.count("constraints", len(cover) + 1)
+    instrumentation.count("constraint_nonzeros", len(indices) + int(is_ww.sum()) + 1)
+    return model, x, V, tours, cover
+
+
+# CBC log lines for the LP bound, a new incumbent and branch-and-bound progress
+ROOT_BOUND_LINE = re.compile(r"Continuous objective value is (\S+) - ([\d.]+) seconds")
+ROOT_CUTS_LINE = re.compile(r"At root node, .* changed objective from \S+ to (\S+) in")
+INCUMBENT_LINE = re.compile(r"Integer solution of (\S+) .*\(([\d.]+) seconds\)")
+PROGRESS_LINE = re.compile(r"After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (\S+) \(([\d.]+) seconds\)")
+NODES_LINE = re.compile(r"Enumerated nodes:\s+(\d+)")
+
+
+class SolverSession:
+    """
+    The van scheduling model kept in memory between solves.
+
+    Route costs, the daily van cost and the route set can be changed in
+    place; each solve starts CBC from the previous solution (MIP start) and
+    accepts a time limit and relative gap. Routes are identified by the ids
+    add_routes returns (the initial routes get 0..n-1, in row order).
+    """
+
+    def __init__(self, routes_df, daily_van_cost=DAILY_VAN_COST):
+        start = time.perf_counter()
+        with instrumentation.stage("model_build"):
+            self.model, x, self.V, tours, self.cover = build_model(routes_df, daily_van_cost)
+        self.x = dict(x)
+        self.routes = {
+            r: {"route": route, "van_type": van_type, "total_cost": float(cost)}
+            for r, (route, van_type, cost) in enumerate(
+                routes_df[["route", "van_type", "total_cost"]].itertuples(index=False)
+            )
+        }
+        self.ids = {(row["route"], row["van_type"]): r for r, row in self.routes.items()}
+        self.next_id = len(self.routes)
+        self.build_seconds = time.perf_counter() - start
+        self.last_result = None
+
+    def route_id(self, route, van_type="WW"):
+        return self.ids.get((route, van_type))
+
+    def set_daily_van_cost(self, daily_van_cost):
+        self.model.objective[self.V] = daily_van_cost
+
+    def set_fleet_limit(self, vans):
+        """Allow at most this many WW vans (None: no limit)."""
+        self.V.upBound = vans
+
+    def set_route_costs(self, costs):
+        """costs: route id -> new total cost."""
+        for r, cost in costs.items():
+            self.routes[r]["total_cost"] = float(cost)
+            self.model.objective[self.x[r]] = float(cost)
+
+    def add_routes(self, routes_df):
+        """Add routes (columns route, total_cost, van_type) to the model; returns their ids."""
+        added = []
+        tours = TourSet.from_frame(routes_df)
+        for row, path in zip(routes_df[["route", "van_type", "total_cost"]].itertuples(index=False), tours.to_paths()):
+            route, van_type, cost = row
+            r = self.next_id
+            self.next_id += 1
+            var = pulp.LpVariable(f"x_{r}", cat="Binary")
+            var.setInitialValue(0)
+            self.x[r] = var
+            self.routes[r] = {"route": route, "van_type": van_type, "total_cost": float(cost)}
+            self.ids[(route, van_type)] = r
+            self.model.objective[var] = float(cost)
+            for store in path[1:-1]:
+                if store not in self.cover:
+                    # a store the model has not seen yet gets its own Cover constraint
+                    self.cover[store] = pulp.LpAffineExpression([(var, 1)]) == 1
+                    self.model += self.cover[store], f"Cover_{store}"
+                else:
+                    self.cover[store].expr[var] = 1
+            if van_type == "WW":
+                self.model.constraints["WW_VanCapacity"].expr[var] = 1
+            added.append(r)
+        return added
+
+    def remove_routes(self, route_ids):
+        """Take routes out of the model: out of every constraint, with their variables fixed at 0."""
+        for r in route_ids:
+            var = self.x.pop(r)
+            row = self.routes.pop(r)
+            del self.ids[(row["route"], row["van_type"])]
+            # PuLP keeps every variable it has seen, so the route stays a column fixed at 0,
+            # and its value is reset so the next MIP start does not still choose it
+            self.model.objective[var] = 0
+            var.upBound = 0
+            var.setInitialValue(0)
+            for store in row["route"].split(SEPARATOR)[1:-1]:
+                if store in self.cover:
+                    self.cover[store].expr.pop(var, None)
+            self.model.constraints["WW_VanCapacity"].expr.pop(var, None)
+
+    def remove_store(self, store):
+        """Drop a store's Cover constraint, e.g. after RoutePool.remove_store."""
+        constraint = self.cover.pop(store)
+        del self.model.constraints[constraint.name]
+
+    def apply_pool_change(self, change, van_type="WW"):
+        """Patch the model with a route_pool.PoolChange for one van type."""
+        self.remove_routes([r for r in (self.route_id(route, van_type) for route in change.removed) if r is not None])
+        added = change.added[["route", "total_cost"]].copy()
+        added["van_type"] = van_type
+        if van_type == "SUB60":
+            added["total_cost"] = SUB60_ROUTE_COST
+        return self.add_routes(added)
+
+    def set_initial_solution(self, route_ids):
+        """MIP start for the next solve: exactly these routes chosen."""
+        chosen = set(route_ids)
+        for r, var in self.x.items():
+            var.setInitialValue(1 if r in chosen else 0)
+        ww = sum(1 for r in chosen if self.routes[r]["van_type"] == "WW")
+        self.V.setInitialValue(math.ceil(ww / 2))
+
+    def solve(self, time_limit=None, gap_rel=None, warm_start=True, msg=False):
+        """
+        Solve, starting from the previous solution (or set_initial_solution)
+        when warm_start is set. Returns a dict with status, objective,
+        best_bound, vans, chosen routes, solve seconds, branch-and-bound
+        nodes and the incumbent/bound trajectory parsed from the CBC log.
+        """
+        log_file = tempfile.NamedTemporaryFile(suffix=".log", delete=False)
+        log_file.close()
+        solver = pulp.PULP_CBC_CMD(
+            msg=False,
+            timeLimit=time_limit,
+            gapRel=gap_rel,
+            warmStart=warm_start,
+            logPath=log_file.name,
+        )
+        start = time.perf_counter()
+        with instrumentation.stage("solve") as stage:
+            self.model.solve(solver)
+        solve_seconds = time.perf_counter() - start
+        log = Path(log_file.name).read_text()
+        os.unlink(log_file.name)
+        if msg:
+            print(log)
+
+        trajectory = []
+        best_bound = None
+        incumbent = None
+        nodes = 0
+        seconds = 0.0
+        for line in log.splitlines():
+            found = NODES_LINE.search(line)
+            if found:
+                nodes = int(found[1])
+            found = ROOT_BOUND_LINE.search(line)
+            if found:
+                best_bound, seconds = float(found[1]), float(found[2])
+                trajectory.append({"seconds": seconds, "incumbent": incumbent, "bound": best_bound})
+            found = ROOT_CUTS_LINE.search(line)
+            if found:
+                best_bound = float(found[1])
+                trajectory.append({"seconds": seconds, "incumbent": incumbent, "bound": best_bound})
+            found = INCUMBENT_LINE.search(line)
+            if found:
+                incumbent, seconds = float(found[1]), float(found[2])
+                trajectory.append({"seconds": seconds, "incumbent": incumbent, "bound": best_bound})
+            found = PROGRESS_LINE.search(line)
+            if found:
+                incumbent, best_bound, seconds = float(found[2]), float(found[3]), float(found[4])
+                trajectory.append({"seconds": seconds, "incumbent": incumbent, "bound": best_bound})
+        # the trace record shares the stage's counters, so this lands in it after the fact
+        stage.count("solver_nodes", nodes)
+
+        chosen = [r for r, var in self.x.items() if var.varValue is not None and var.varValue > 0.5]
+        self.last_result = {
+            "status": pulp.LpStatus[self.model.status],
+            "objective": pulp.value(self.model.objective),
+            "best_bound": best_bound,
+            "vans": pulp.value(self.V),
+            "chosen": pd.DataFrame([{"id": r, **self.routes[r]} for r in chosen]),
+            "solve_seconds": solve_seconds,
+            "nodes": nodes,
+            "trajectory": trajectory,
+        }
+        return self.last_result
+
+
+def main_column_generation(matrix_csv):
+    import column_generation
+    from duration_matrix import DurationMatrix
+    from store_data import DEMAND_WEEKDAYS
 
-# Assemble model
-model = pulp.LpProblem("Woolworths_Van_Scheduling", pulp.LpMinimize)
+    durations = DurationMatrix.from_csv(matrix_csv)
+    result = column_generation.solve_column_generation(durations, DEMAND_WEEKDAYS, msg=True)
 
-# Decision variables
-x = pulp.LpVariable.dicts("x", R, cat="Binary")       # route chosen
-V = pulp.LpVariable("Vans_retained", lowBound=0, cat="Integer")  # number of WW vans kept
+    print("Status:", result["status"])
+    print("Best cost over generated routes:", result["objective"])
+    if result["converged"]:
+        print("LP lower bound:", result["lp_bound"])
+    else:
+        print(f"Pricing stopped after {result['rounds']} rounds without converging; no lower bound")
+    print("Woolworths vans retained:", result["vans"])
+    print(f"Pricing: {result['rounds']} rounds, {len(result['routes'])} routes, {result['pricing_seconds']:.3f} s")
+    print("\nChosen routes:")
+    for route, route_cost, route_van_type in result["chosen"][["route", "total_cost", "van_type"]].itertuples(index=False):
+        print(" -", route, "| Cost:", route_cost, "| Van type:", route_van_type)
 
-# Objective: route costs + fixed daily van costs
-model += pulp.lpSum(cost[r] * x[r] for r in R) + DAILY_VAN_COST * V, "TotalCost"
 
-# Constraint (a): every store covered exactly once
-for s in S:
-    model += pulp.lpSum((s in r.split("->")) * x[r] for r in R) == 1, f"Cover_{s}"
+if __name__ == "__main__":
+    import argparse
 
-# Constraint (b): WW van capacity (each van can do 2 routes)
-model += pulp.lpSum(x[r] for r in R if van_type[r] == "WW") <= 2 * V, "WW_VanCapacity"
+    parser = argparse.ArgumentParser(description="Woolworths van scheduling")
+    parser.add_argument(
+        "--mode",
+        choices=["enumerated", "colgen"],
+        default="enumerated",
+        help="enumerated: every route from the cost CSVs; colgen: generate routes from the duration matrix",
+    )
+    parser.add_argument("--matrix", default="WoolworthsDurations2025.csv", help="durations CSV (colgen mode)")
+    parser.add_argument("--time-limit", type=float, default=None, help="CBC time limit in seconds")
+    parser.add_argument("--gap", type=float, default=None, help="relative MIP gap to stop at")
+    args = parser.parse_args()
+    if args.mode == "colgen":
+        main_column_generation(args.matrix)
+        raise SystemExit
 
-# Solve
-solver = pulp.PULP_CBC_CMD(msg=True)
-model.solve(solver)
+    routes_df = load_routes()
+    session = SolverSession(routes_df)
+    result = session.solve(time_limit=args.time_limit, gap_rel=args.gap, msg=True)
 
-# Display results
-print("Status:", pulp.LpStatus[model.status])
-print("Optimal cost:", pulp.value(model.objective))
-print("Woolworths vans retained:", pulp.value(V))
-print("\nChosen routes:")
-for r in R:
-    if pulp.value(x[r]) > 0.5:
-        print(" -", r, "| Cost:", cost[r], "| Van type:", van_type[r])
+    # Display results
+    print("Status:", result["status"])
+    print("Optimal cost:", result["objective"])
+    print("Woolworths vans retained:", result["vans"])
+    print(f"Model build: {session.build_seconds:.3f} s ({len(session.routes)} routes, {len(session.cover)} stores)")
+    print(f"Solve: {result['solve_seconds']:.3f} s")
+    print("\nChosen routes:")
+    for route, route_cost, route_van_type in result["chosen"][["route", "total_cost", "van_type"]].itertuples(index=False):
+        print(" -", route, "| Cost:", route_cost, "| Van type:", route_van_type)
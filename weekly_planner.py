@@ -0,0 +1,189 @@
+"""
+Weekly plan with one WW fleet shared by every day type.
+
+The fleet is paid for all year, so the week costs
+
+    fleet * ANNUAL_VAN_COST / weeks per year + sum over day types of (days per week * routing cost that day)
+
+where a day's routing cost is the cheapest set of routes with at most two
+WW routes per van. For every fleet size from 0 up to the point where the
+limit can no longer bind, each day type's routing problem is solved on
+its own: the (day type, fleet sizes) subproblems run in parallel worker
+processes that share one copy of the duration matrix, each warm-starting
+CBC from the previous fleet size. The fleet with the cheapest week wins.
+Stores with no boxes on a day type are not visited that day.
+
+    python weekly_planner.py --workers 4
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pulp
+
+import plan
+import van_schedule_solver
+from duration_matrix import DurationMatrix
+from store_data import (
+    DEMAND_SATURDAYS,
+    DEMAND_WEEKDAYS,
+    MATRIX_CSV,
+    MAX_DEMAND_EXTRA,
+    MAX_DEMAND_STANDARD,
+    MAX_INTERMEDIATE,
+    delivered,
+)
+
+# day type -> (boxes per store, days of that type per week)
+DAYS = {
+    "weekdays": (DEMAND_WEEKDAYS, 5),
+    "saturdays": (DEMAND_SATURDAYS, 1),
+}
+
+# Set in each worker by _attach_durations
+_durations = None
+_shm = None
+
+
+def max_useful_fleet(days):
+    # every WW route visits a store, so beyond ceil(stores / 2) vans the limit never binds
+    return max(math.ceil((len(delivered(demand)) - 1) / 2) for demand, _ in days.values())
+
+
+def solve_day(durations, day, demand, fleet_sizes, max_demand_standard, max_demand_extra, max_intermediate, time_limit=None, gap_rel=None):
+    """
+    Routing cost of one day type for each fleet size, smallest first.
+
+    A fleet size only counts as feasible when CBC returns a schedule
+    (status Optimal); proven is False when that schedule is an incumbent
+    cut short by time_limit or gap_rel rather than a proven optimum.
+    """
+    demand = delivered(demand)
+    results = []
+    if len(demand) <= 1:
+        # nothing to deliver
+        return [
+            {"day": day, "vans": vans, "status": "Optimal", "proven": True, "routing_cost": 0.0, "chosen": [], "seconds": 0.0}
+            for vans in fleet_sizes
+        ]
+
+    pools = plan.costed_pools(
+        durations, demand, max_demand_standard, max_demand_extra, max_intermediate, use_cache=False
+    )
+    session = van_schedule_solver.SolverSession(plan.routes_frame(pools), daily_van_cost=0.0)
+    for vans in fleet_sizes:
+        session.set_fleet_limit(vans)
+        result = session.solve(time_limit=time_limit, gap_rel=gap_rel)
+        # "Not Solved" means CBC stopped without any schedule; a time-limited incumbent still reports Optimal
+        feasible = result["status"] == "Optimal" and result["objective"] is not None
+        results.append(
+            {
+                "day": day,
+                "vans": vans,
+                "status": result["status"],
+                "proven": feasible and session.model.sol_status == pulp.LpSolutionOptimal,
+                "routing_cost": result["objective"] if feasible else math.inf,
+                "chosen": result["chosen"].to_dict("records") if feasible else [],
+                "seconds": result["solve_seconds"],
+            }
+        )
+    return results
+
+
+def _attach_durations(spec):
+    global _durations, _shm
+    _shm, _durations = DurationMatrix.attach(spec)
+
+
+def _solve_in_worker(task):
+    return solve_day(_durations, *task)
+
+
+def plan_week(
+    durations,
+    days=DAYS,
+    max_demand_standard=MAX_DEMAND_STANDARD,
+    max_demand_extra=MAX_DEMAND_EXTRA,
+    max_intermediate=MAX_INTERMEDIATE,
+    annual_van_cost=van_schedule_solver.ANNUAL_VAN_COST,
+    working_days=van_schedule_solver.WORKING_DAYS,
+    workers=None,
+    time_limit=None,
+    gap_rel=None,
+):
+    """
+    Cheapest shared fleet and per-day routes for a week.
+
+    Returns a dict with vans, weekly_cost, annual_cost, days ({day type:
+    routing cost and chosen routes at that fleet}), proven (every day's
+    schedule at that fleet is a proven optimum), by_fleet ({fleet size:
+    weekly cost}), wall_seconds and solve_seconds (summed over workers).
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count()
+    fleet_sizes = list(range(max_useful_fleet(days) + 1))
+    weeks = working_days / sum(per_week for _, per_week in days.values())
+
+    # split each day type's fleet range so there is work for every worker
+    chunks = max(1, min(len(fleet_sizes), workers // len(days)))
+    size = math.ceil(len(fleet_sizes) / chunks)
+    tasks = [
+        (day, demand, fleet_sizes[first : first + size], max_demand_standard, max_demand_extra, max_intermediate, time_limit, gap_rel)
+        for day, (demand, _) in days.items()
+        for first in range(0, len(fleet_sizes), size)
+    ]
+
+    shm, spec = durations.to_shared()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_durations, initargs=(spec,)) as pool:
+            solved = [row for rows in pool.map(_solve_in_worker, tasks) for row in rows]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    routing = {(row["day"], row["vans"]): row for row in solved}
+    by_fleet = {
+        vans: vans * annual_van_cost / weeks
+        + sum(per_week * routing[(day, vans)]["routing_cost"] for day, (_, per_week) in days.items())
+        for vans in fleet_sizes
+    }
+    vans = min(by_fleet, key=by_fleet.get)
+    return {
+        "vans": vans,
+        "weekly_cost": by_fleet[vans],
+        "annual_cost": by_fleet[vans] * weeks,
+        "days": {day: routing[(day, vans)] for day in days},
+        "proven": all(routing[(day, vans)]["proven"] for day in days),
+        "by_fleet": by_fleet,
+        "wall_seconds": time.perf_counter() - start,
+        "solve_seconds": sum(row["seconds"] for row in solved),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Weekly van plan with one shared fleet")
+    parser.add_argument("--matrix", default=MATRIX_CSV, help="durations CSV")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--time-limit", type=float, default=None, help="CBC time limit per subproblem")
+    parser.add_argument("--gap", type=float, default=None, help="relative MIP gap per subproblem")
+    args = parser.parse_args()
+
+    result = plan_week(
+        DurationMatrix.from_csv(args.matrix),
+        workers=args.workers,
+        time_limit=args.time_limit,
+        gap_rel=args.gap,
+    )
+    print("Woolworths vans retained:", result["vans"])
+    print(f"Weekly cost: {result['weekly_cost']:.2f} (annual {result['annual_cost']:.2f})")
+    if not result["proven"]:
+        print("Some day types stopped at the time limit or gap; their routing costs are not proven optimal.")
+    print("Weekly cost by fleet size:", ", ".join(f"{vans}: {cost:.0f}" for vans, cost in result["by_fleet"].items()))
+    for day, row in result["days"].items():
+        print(f"\n{day}: routing cost {row['routing_cost']:.2f}")
+        for route in row["chosen"]:
+            print(" -", route["route"], "| Cost:", route["total_cost"], "| Van type:", route["van_type"])
+    print(f"\nSolved in {result['wall_seconds']:.2f} s ({result['solve_seconds']:.2f} s of CBC across workers)")